@@ -0,0 +1,44 @@
+#!/bin/sh
+#
+# Builds platform-specific wheels for AudioFS - whose modules have been
+# compiled using Cython - that can be run on most Linux systems. The wheels
+# are written to the 'wheelhouse' subdirectory of the current directory.
+#
+# Usage: build-wheels.sh [arch ...]
+#
+# where each 'arch' is an architecture to build wheels for (for example
+# 'x86_64' or 'aarch64'): if none are specified then wheels are built for
+# both x86_64 and aarch64.
+#
+# Note: this requires that cibuildwheel be installed, as well as docker or
+# podman. Building wheels for an architecture other than that of the
+# current machine requires that QEMU be set up to emulate it.
+#
+# Copyright (C) James MacKay 2008
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+
+archs="$*"
+[ -n "$archs" ] || archs="x86_64 aarch64"
+
+CIBW_ARCHS_LINUX="$archs"
+CIBW_BUILD="cp3*-manylinux_*"
+CIBW_MANYLINUX_X86_64_IMAGE="manylinux_2_28"
+CIBW_MANYLINUX_AARCH64_IMAGE="manylinux_2_28"
+CIBW_ENVIRONMENT="AUDIOFS_CYTHON_COMPILE=1 AUDIOFS_PORTABLE_BUILD=1"
+export CIBW_ARCHS_LINUX CIBW_BUILD CIBW_MANYLINUX_X86_64_IMAGE \
+    CIBW_MANYLINUX_AARCH64_IMAGE CIBW_ENVIRONMENT
+
+exec cibuildwheel --platform linux --output-dir wheelhouse .
@@ -14,40 +14,287 @@
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 #
 
-from distutils.core import setup
+import os
+import sys
+
+from setuptools import Extension, setup
+from setuptools.command.build_ext import build_ext
+from setuptools.command.sdist import sdist
+
+
+# Constants.
 
 _pkgName = "audiofs"
-_version = "0.3"
-_pkgDir = "%s-%s" % (_pkgName, _version)
+
+# The Cython compiler directives used to compile our package's modules.
+#
+# Note: our modules are untyped Python code that uses negative indices and
+# Python's integer division semantics freely, so directives that are only
+# safe for typed code - like 'boundscheck', 'wraparound', 'cdivision' and
+# 'infer_types' (when True) - aren't used.
+_cythonDirectives = {
+    'language_level': 3,
+    'profile': False,
+    'linetrace': False,
+    'infer_types': None     # only infer types that are safe to infer
+}
+
+# The names of the modules in our package that are compiled using Cython
+# when it's requested: they're the ones that do most of the work in our
+# filesystems and in scanning music directories. The package's other modules
+# are always installed as pure Python.
+_cythonModules = ["fscommon", "mergedfs", "cachefs", "flactrackfs",
+    "flac2mp3fs", "flac2oggfs", "filesearchfs", "musicsearchfs", "musicfs",
+    "music", "utilities"]
+
+# The names of the modules in our package that are written in Cython (and so
+# are only built when our package is compiled using Cython). Each has a
+# corresponding '.pyx' source file.
+#
+# Note: these modules are all optional, since our package's modules only
+# use them when they're available.
+_cythonOnlyModules = ["_musicspeedups", "_adminspeedups",
+    "_cachefsspeedups"]
+
+# The extra arguments to pass to the C compiler and linker when building our
+# extension modules.
+#
+# Note: '-ffast-math' isn't used since it would change the semantics of
+# the floating point operations in the compiled Python code.
+_extraCompileArgs = ["-O3", "-funroll-loops"]
+_extraLinkArgs = ["-Wl,-O1"]
+
+# The extra arguments to pass to the C compiler when building our extension
+# modules to be run only on the machine they're built on.
+_nativeCompileArgs = ["-march=native"]
+
+# The pathname of the file from which the features of the machine that we're
+# being built on are obtained.
+_cpuInfoPathname = "/proc/cpuinfo"
+
+# A map from the name of each CPU feature (as it appears in the 'flags'
+# line(s) of our CPU information file) that our extension modules can take
+# advantage of to the name of the C preprocessor macro that's defined when
+# the machine that they're built on has that feature.
+_cpuFeatureMacros = {
+    "sse4_2": "AUDIOFS_HAVE_SSE4_2",
+    "avx2": "AUDIOFS_HAVE_AVX2",
+    "fma": "AUDIOFS_HAVE_FMA"
+}
+
+# The command line option that specifies that our package's modules are to
+# be compiled using Cython.
+_cythonCompileOption = "--cython-compile"
+
+# The command line option that specifies that, when our package's modules
+# are compiled using Cython, an annotated HTML version of each module is to
+# be generated (next to the module) that shows which of its lines still
+# use the Python/C API heavily. (It implies our Cython compile option.)
+_cythonAnnotateOption = "--cython-annotate"
+
+# The names of the environment variables that, when set to a non-empty
+# value, specify (respectively) that our package's modules are to be
+# compiled using Cython, that annotated versions of them are to be
+# generated when they're compiled, and that they're to be compiled so that
+# they can run on machines other than the one they're built on (as is
+# needed when building wheels for distribution).
+#
+# Note: the first two are equivalent to our Cython compile and annotate
+# options, and are useful when setup.py is being run by a tool like pip or
+# cibuildwheel.
+_cythonCompileEnvVar = "AUDIOFS_CYTHON_COMPILE"
+_cythonAnnotateEnvVar = "AUDIOFS_CYTHON_ANNOTATE"
+_portableBuildEnvVar = "AUDIOFS_PORTABLE_BUILD"
+
+# The pathname of the file containing the names of the programs that we
+# install, one per line.
+_scriptNamesPathname = "src/scripts.txt"
+
+# The name of the program that we install that can run any of our other
+# programs (each of which can also be installed as a symlink to it).
+_multicallScriptName = "audiofs"
+
+# The number of jobs to use to compile our extension modules in parallel.
+_numBuildJobs = os.cpu_count() or 1
+
+
+# Classes.
+
+class _ParallelBuildExtCommand(build_ext):
+    """
+    The class of 'build_ext' command that we use to build our extension
+    modules: unless told otherwise it compiles them in parallel.
+    """
+
+    def finalize_options(self):
+        if self.parallel is None:
+            self.parallel = _numBuildJobs
+        build_ext.finalize_options(self)
+
+class _SdistCommand(sdist):
+    """
+    The class of 'sdist' command that we use to build our source
+    distributions: it first uses Cython to generate the C files for all of
+    our modules that can be compiled using Cython, so that they're included
+    in the source distribution and can be compiled without Cython.
+    """
+
+    def run(self):
+        try:
+            from Cython.Build import cythonize
+        except ImportError:
+            cythonize = None
+        if cythonize is not None:
+            cythonize(_cythonSourcePathnames(), nthreads = _numBuildJobs,
+                      compiler_directives = _cythonDirectives)
+        else:
+            self.warn("Cython isn't installed, so the source distribution "
+                      "won't include the C files generated from our modules")
+        sdist.run(self)
+
+
+# Functions.
+
+def _cpuFeatures():
+    """
+    Returns a set of the names of the features of the CPU of the machine
+    that we're being built on, which will be empty if they can't be
+    determined.
+    """
+    result = set()
+    try:
+        f = open(_cpuInfoPathname)
+        try:
+            for line in f:
+                if line.startswith("flags"):
+                    result.update(line.split(":", 1)[-1].split())
+        finally:
+            f.close()
+    except IOError:
+        pass  # we just can't tell what features the CPU has
+    assert result is not None
+    return result
+
+def _nativeDefineMacros():
+    """
+    Returns a list of the C preprocessor macros - as (name, value) pairs -
+    to define when building our extension modules to be run only on the
+    machine that they're built on.
+    """
+    features = _cpuFeatures()
+    result = [(macro, "1") for (feature, macro) in
+                sorted(_cpuFeatureMacros.items()) if feature in features]
+    assert result is not None
+    return result
+
+def _extensionModules():
+    """
+    Returns a list of the extension modules to build from those of our
+    package's modules that are to be compiled using Cython, or None if our
+    package is to be installed as pure Python.
+
+    Note: this removes our Cython compile and annotate options from
+    sys.argv (if they're present) so that setup() doesn't see them.
+    """
+    result = None
+    doCompile = bool(os.environ.get(_cythonCompileEnvVar))
+    doAnnotate = bool(os.environ.get(_cythonAnnotateEnvVar))
+    if _cythonCompileOption in sys.argv:
+        sys.argv.remove(_cythonCompileOption)
+        doCompile = True
+    if _cythonAnnotateOption in sys.argv:
+        sys.argv.remove(_cythonAnnotateOption)
+        doAnnotate = True
+    if doAnnotate:
+        doCompile = True
+    if doCompile:
+        try:
+            from Cython.Build import cythonize
+        except ImportError:
+            cythonize = None
+        srcs = _cythonSourcePathnames()
+        if cythonize is None:
+            # Build our extension modules from the C files previously
+            # generated from them by Cython (as are included in our source
+            # distributions), if they're all present.
+            srcs = [os.path.splitext(f)[0] + ".c" for f in srcs]
+            if doAnnotate or not all([os.path.exists(f) for f in srcs]):
+                sys.exit("Compiling using Cython (as requested by the '%s' "
+                         "option or the %s environment variable) requires "
+                         "that Cython be installed." %
+                         (_cythonCompileOption, _cythonCompileEnvVar))
+        compileArgs = _extraCompileArgs
+        macros = []
+        if not os.environ.get(_portableBuildEnvVar):
+            compileArgs = compileArgs + _nativeCompileArgs
+            macros = _nativeDefineMacros()
+        result = [Extension("%s.%s" % (_pkgName,
+                                os.path.splitext(os.path.basename(f))[0]),
+                            [f],
+                            define_macros = macros,
+                            extra_compile_args = compileArgs,
+                            extra_link_args = _extraLinkArgs)
+                  for f in srcs]
+        if cythonize is not None:
+            result = cythonize(result, nthreads = _numBuildJobs,
+                               annotate = doAnnotate,
+                               compiler_directives = _cythonDirectives)
+    return result
+
+def _cythonSourcePathnames():
+    """
+    Returns a list of the pathnames of the source files of all of our
+    modules that are compiled using Cython.
+    """
+    result = ["src/%s/%s.py" % (_pkgName, m) for m in _cythonModules]
+    result.extend(["src/%s/%s.pyx" % (_pkgName, m)
+                    for m in _cythonOnlyModules])
+    assert result is not None
+    return result
+
+def _readScriptNames():
+    """
+    Reads and returns a list of the names of the programs that we install.
+    """
+    f = open(_scriptNamesPathname)
+    try:
+        result = [line.strip() for line in f if line.strip()]
+    finally:
+        f.close()
+    return result
+
+
+# Calculated constants.
+
+# The names of the programs that we install, and the console_scripts entry
+# point specifications for them and for our multicall program (which can
+# run any of them).
+#
+# Note: all of our programs are run by the same dispatch function, which
+# determines which program to run from the name it's invoked as.
+_scriptNames = tuple(_readScriptNames())
+_consoleScripts = tuple(["%s = %s.cli:dispatch" % (s, _pkgName)
+                         for s in (_multicallScriptName,) + _scriptNames])
+
+
+# Main program.
 
 setup(author = "James MacKay",
     author_email = "jmackay@steelcandy.com",
     name = "AudioFS",
     url = "http://www.steelcandy.com",
-    version = _version,
+    use_scm_version = True,
     description = "Audio-related FUSE filesystems, along with optional music directory management and MPD music server integration",
     license = "GPL version 3",
     platforms = "linux",
-    requires = ["fuse (>=0.2)"],
+    install_requires = ["fuse-python>=0.2,<2"],
+    extras_require = { "io_uring": ["liburing>=2026.3"] },
     package_dir = { '': 'src' },
-    packages = [_pkgName],
-    scripts = ["src/%s" % s for s in ["activate-music-directory",
-        "build-music-directory", "catalogue-music-directory",
-        "change-music-rating", "create-compact-album-list", "create-playlist",
-        "deactivate-music-directory", "dismantle-music-directory",
-        "flac2mp3", "flactrack", "flac2ogg", "generate-playlists",
-        "lirc-client", "list-unrated", "maintain-cache-directory",
-        "mpd-add-tracks", "mpd-all", "mpd-insert-tracks", "mpd-request-tracks",
-        "mpd-create-database", "mpd-decrease-rating",
-        "mpd-hide-current-track-info", "mpd-increase-rating",
-        "mpd-list-servers", "mpd-preload-playlists",
-        "mpd-refresh-current-track-info", "mpd-server-info", "mpd-set-rating",
-        "mpd-show-current-track-info", "mpd-speak-current-track-info",
-        "mpd-update-radio-playlist", "mpd-select-server",
-        "mpd-selected-server-mpc",
-        "mpd-toggle-current-track-info", "musicsearch", "ncmpc-all",
-        "preload-audio-files", "refresh-ratings-files",
-        "show-music-rating"]],
-    data_files = [("/etc/%s"  % _pkgName, ["etc/configuration.py.example"]),
-                  ("/etc/%s"  % _pkgName, ["etc/lirc-client.map.example"]),
-                  ("doc/%s"   % _pkgDir, ["doc/index.html"])])
+    packages = [_pkgName, "%s.cli" % _pkgName, "%s._resources" % _pkgName],
+    package_data = { "%s._resources" % _pkgName: ["*.example", "*.html"] },
+    ext_modules = _extensionModules(),
+    cmdclass = { 'build_ext': _ParallelBuildExtCommand,
+                 'sdist': _SdistCommand },
+    include_package_data = True,
+    exclude_package_data = { _pkgName: ["*.c", "*.pyx"] },
+    entry_points = { 'console_scripts': list(_consoleScripts) })
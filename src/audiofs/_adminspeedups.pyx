@@ -0,0 +1,156 @@
+# Defines compiled versions of some of the functions in the 'admin' module
+# that are called once per directory while building the analogues of the
+# data directories.
+#
+# Note: this module is optional: it's only built when our package is
+# compiled using Cython, and the 'admin' module uses its own (pure Python)
+# versions of these functions when this module isn't available.
+#
+# Copyright (C) James MacKay 2008
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+
+import os
+
+from libc cimport errno
+from posix.stat cimport struct_stat, S_ISDIR, S_ISREG, S_ISLNK
+
+
+cdef extern from "Python.h":
+    object PyUnicode_DecodeFSDefault(const char *s)
+
+cdef extern from "<dirent.h>" nogil:
+    ctypedef struct DIR:
+        pass
+    struct dirent:
+        unsigned char d_type
+        char d_name[1]
+    DIR *opendir(const char *name)
+    dirent *readdir(DIR *dirp)
+    int closedir(DIR *dirp)
+    int dirfd(DIR *dirp)
+    enum:
+        DT_UNKNOWN
+        DT_DIR
+        DT_REG
+        DT_LNK
+
+cdef extern from "<sys/stat.h>" nogil:
+    int fstatat(int fd, const char *pathname, struct_stat *buf, int flags)
+
+cdef extern from "<fcntl.h>" nogil:
+    enum:
+        AT_SYMLINK_NOFOLLOW
+
+
+# Functions.
+
+def _ad_scanDirectory(str d):
+    """
+    See admin._ad_scanDirectory().
+
+    Note: the directory is read using readdir() directly, and an entry is
+    only stat()ed if its type isn't known or it's a symlink (in which case
+    its target's type is needed).
+    """
+    assert d is not None
+    cdef bytes bd = os.fsencode(d)
+    cdef const char *cd = bd
+    cdef DIR *dp
+    cdef dirent *ep
+    cdef struct_stat st
+    cdef const char *name
+    cdef unsigned char t
+    cdef int fd
+    cdef int err
+    cdef bint isDir
+    cdef bint isFile
+    cdef bint isLink
+    cdef bint hasSymlinks = False
+    cdef list listing = []
+    with nogil:
+        dp = opendir(cd)
+    if dp == NULL:
+        err = errno.errno
+        raise OSError(err, os.strerror(err), d)
+    try:
+        fd = dirfd(dp)
+        while True:
+            errno.errno = 0
+            with nogil:
+                ep = readdir(dp)
+            if ep == NULL:
+                err = errno.errno
+                if err != 0:
+                    raise OSError(err, os.strerror(err), d)
+                break
+            name = ep.d_name
+            if name[0] == b'.' and (name[1] == 0 or
+                                    (name[1] == b'.' and name[2] == 0)):
+                continue  # skip the '.' and '..' entries, as scandir() does
+            t = ep.d_type
+            if t == DT_DIR:
+                (isDir, isFile, isLink) = (True, False, False)
+            elif t == DT_REG:
+                (isDir, isFile, isLink) = (False, True, False)
+            else:
+                # Note: like scandir(), an entry that can't be stat()ed is
+                # treated as being neither a directory nor a file.
+                (isDir, isFile) = (False, False)
+                isLink = (t == DT_LNK)
+                if t == DT_UNKNOWN:
+                    if fstatat(fd, name, &st, AT_SYMLINK_NOFOLLOW) == 0:
+                        isLink = S_ISLNK(st.st_mode)
+                        if not isLink:
+                            isDir = S_ISDIR(st.st_mode)
+                            isFile = S_ISREG(st.st_mode)
+                if isLink and fstatat(fd, name, &st, 0) == 0:
+                    isDir = S_ISDIR(st.st_mode)
+                    isFile = S_ISREG(st.st_mode)
+            if isLink:
+                hasSymlinks = True
+            listing.append((PyUnicode_DecodeFSDefault(name), isDir, isFile))
+    finally:
+        closedir(dp)
+    return (listing, hasSymlinks)
+
+def _ad_audioFilenames(list names, nonAudioExts):
+    """
+    See admin._ad_audioFilenames().
+    """
+    assert names is not None
+    assert nonAudioExts is not None
+    cdef list result = []
+    cdef str f
+    cdef str ext
+    cdef Py_ssize_t i
+    cdef Py_ssize_t j
+    cdef Py_ssize_t n
+    for f in names:
+        # Note: like splitext(), a leading '.' doesn't start an extension,
+        # so an extension only starts at a '.' that follows some other
+        # character.
+        i = f.rfind(".")
+        if i > 0:
+            n = i
+            j = 0
+            while j < n and f[j] == ".":
+                j += 1
+            if j < n:
+                ext = f[i:].lower()
+                if ext in nonAudioExts:
+                    continue
+        result.append(f)
+    return result
@@ -0,0 +1,125 @@
+# Defines a compiled version of the class in the 'cachefs' module whose
+# methods are called once per read from or write to a file in a caching
+# filesystem.
+#
+# Note: this module is optional: it's only built when our package is
+# compiled using Cython, and the 'cachefs' module uses its own (pure Python)
+# version of this class when this module isn't available.
+#
+# Copyright (C) James MacKay 2008
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+
+import errno as _errno
+import os
+
+from cpython.bytes cimport PyBytes_AS_STRING, PyBytes_FromStringAndSize
+from libc cimport errno
+from posix.types cimport off_t
+from posix.unistd cimport pread, pwrite
+
+
+# Constants.
+
+# See cachefs._fs_noAccessTimeUpdateFlags.
+cdef int _fs_noAccessTimeUpdateFlags = getattr(os, "O_NOATIME", 0)
+
+
+# Functions.
+
+cdef int _fs_raiseOSError() except -1:
+    """
+    Raises an OSError that describes the error that the last failed syscall
+    set 'errno' to.
+    """
+    cdef int err = errno.errno
+    raise OSError(err, os.strerror(err))
+
+
+# Classes.
+
+cdef class fs_CachedFile:
+    """
+    See cachefs.fs_CachedFile.
+
+    Note: reads and writes are done using pread() and pwrite() directly,
+    and our fields are C fields, so that the overhead of each read or write
+    beyond the syscall itself is as small as possible.
+    """
+
+    cdef int _fs_fd
+    cdef object _fs_path
+    cdef long long _fs_startSize
+    cdef object _fs_sizeChange
+
+    def __init__(self, path, flags, *mode):
+        try:
+            fd = os.open(path, flags | _fs_noAccessTimeUpdateFlags, *mode)
+        except OSError as ex:
+            if ex.errno != _errno.EPERM or not _fs_noAccessTimeUpdateFlags:
+                raise
+            fd = os.open(path, flags, *mode)  # we don't own the file
+        self._fs_fd = fd
+        self._fs_path = path
+        self._fs_startSize = os.fstat(fd).st_size
+        self._fs_sizeChange = None
+
+    def fs_sizeIncreaseInBytes(self):
+        """
+        See cachefs.fs_CachedFile.fs_sizeIncreaseInBytes().
+        """
+        return self._fs_sizeChange
+
+
+    # FUSE methods.
+
+    def read(self, Py_ssize_t length, off_t offset):
+        cdef bytes result = PyBytes_FromStringAndSize(NULL, length)
+        cdef char *buf = PyBytes_AS_STRING(result)
+        cdef Py_ssize_t n
+        with nogil:
+            n = pread(self._fs_fd, buf, length, offset)
+        if n < 0:
+            _fs_raiseOSError()
+        if n < length:
+            result = result[:n]  # we read past the end of our file
+        return result
+
+    def write(self, const unsigned char[::1] buf, off_t offset):
+        cdef Py_ssize_t length = buf.shape[0]
+        cdef const unsigned char *p = &buf[0] if length > 0 else NULL
+        cdef Py_ssize_t result
+        with nogil:
+            result = pwrite(self._fs_fd, p, length, offset)
+        if result < 0:
+            _fs_raiseOSError()
+        return result
+
+    def flush(self):
+        pass  # we don't buffer anything that's written to our file
+
+    def fgetattr(self):
+        return os.fstat(self._fs_fd)
+
+    def ftruncate(self, length):
+        os.ftruncate(self._fs_fd, length)
+
+    def release(self, flags = None):
+        fd = self._fs_fd
+        newSize = os.fstat(fd).st_size
+        os.close(fd)
+        self._fs_sizeChange = newSize - self._fs_startSize
+        self._fs_startSize = newSize  # in case we're opened again
+
@@ -0,0 +1,67 @@
+# Defines compiled versions of some of the functions in the 'music' module
+# that are called once per track while cataloguing a music directory.
+#
+# Note: this module is optional: it's only built when our package is
+# compiled using Cython, and the 'music' module uses its own (pure Python)
+# versions of these functions when this module isn't available.
+#
+# Copyright (C) James MacKay 2008
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+
+import audiofs.utilities as ut
+
+
+# Functions.
+
+def _mu_convertSexagesimalDurationToSeconds(str d):
+    """
+    See music._mu_convertSexagesimalDurationToSeconds().
+    """
+    assert d is not None
+    cdef list parts = d.split(":")
+    cdef double total = 0.0
+    cdef double m = 1.0
+    cdef Py_ssize_t i
+    if len(parts) != 3:
+        return -1
+    try:
+        for i in range(2, -1, -1):
+            total += float(parts[i]) * m
+            m *= 60.0
+    except ValueError:
+        return -1
+    assert total >= 0
+    return total
+
+def _mu_flacCueFileBreakpointToSeconds(str br):
+    """
+    See music._mu_flacCueFileBreakpointToSeconds().
+    """
+    assert br is not None
+    cdef list parts = br.split(":")
+    cdef double total = 0.0
+    cdef double factor = 1.0
+    cdef double p
+    cdef Py_ssize_t i
+    assert parts
+    if not ut.ut_areAllNumbers(parts):
+        return -1
+    for i in range(len(parts) - 1, -1, -1):
+        p = float(parts[i])
+        assert p >= 0
+        total += p * factor
+        factor *= 60.0
+    return total
@@ -17,22 +17,30 @@
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 #
 
+import concurrent.futures
+import errno
+import functools
+import json
 import os
 import os.path
+import shlex
+import subprocess
 import sys
+import threading
 import time
 
-import getopt
-
-import mpd
-import musicfs
-
-import config
-import utilities as ut
+import audiofs.config as config
+import audiofs.uringio as ur
+import audiofs.utilities as ut
 
 
 # Constants.
 
+# Note: the 'mpd' and 'musicfs' modules are only imported by the methods that
+# use them, so that programs that don't use them (directly or indirectly)
+# don't have to wait for them (and all of the modules that they import) to
+# be imported.
+
 _conf = config.obtain()
 
 # Verbosity levels (for error/message reporting).
@@ -41,15 +49,66 @@ QUIET = 1               # only report errors
 NORMAL_VERBOSITY = 2    # report errors and messages
 VERBOSE = 3             # report errors, messages and debugging info
 
-_ad_allVerbosityLevels = range(VERBOSE + 1)
+_ad_allVerbosityLevels = frozenset([SILENT, QUIET, NORMAL_VERBOSITY, VERBOSE])
 
 # The mount option(s) used to specify a "real" files directory.
 _ad_realOptsPart = ',real=%s'
 
+# The prefix of every filesystem's mount options: the configured common mount
+# options followed by a comma, or an empty string if there aren't any.
+_ad_commonMountOptionsPrefix = _conf.commonMountOptions
+if _ad_commonMountOptionsPrefix:
+    _ad_commonMountOptionsPrefix += ","
+
+
+# The maximum number of threads used to create the symlinks to the files in
+# the data directories. (Creating a symlink spends most of its time waiting
+# on the filesystem, so creating several at once is faster.)
+_ad_maxSymlinkThreads = 8
+
+# The maximum number of threads used to walk the data directories. (Reading
+# a directory also spends most of its time waiting on the filesystem, and
+# different directories can be read independently.)
+_ad_maxWalkThreads = 32
+
+# True iff the status of each audio file in the data directories is to be
+# obtained (and discarded) while the data directories' analogues are being
+# built. It's only done to get the files' inodes cached, so that the
+# programs that later access the files through the analogues' symlinks
+# don't have to wait for them to be read (which can take a while, for
+# example if the data directories are on a network filesystem), so it's
+# off unless the configuration turns it on.
+_ad_doPrefetchAudioFileStatuses = _conf.doPrefetchAudioFileStatuses
+
+# The lock that's held while writing a message, so that messages written by
+# different threads aren't interleaved.
+_ad_outputLock = threading.Lock()
+
+
+# The maximum number of bytes that we read from the start of a PID file: its
+# first line is much shorter than this.
+_ad_maxPidFileReadSize = 64
+
 
 # The basename of the README file that's created in the root music directory.
 _ad_readmeFilename = "README.txt"
 
+# The format of the pathname of the temporary directory that a "real audio
+# files" directory is built in before it's renamed to its actual pathname:
+# it's formatted with the directory's pathname and our process' ID.
+_ad_newRealDirectoryFormat = "%s.new.%i"
+
+# The basename of the file - in the source metadata directory, since that
+# isn't under the music directory and so survives it being dismantled - in
+# which we cache the listings of the data directories' directories.
+_ad_directoryListingsCacheFilename = ".data-directory-listings.json"
+
+# A directory's listing isn't cached if the directory was modified or had
+# its status changed less than this many nanoseconds before it was listed,
+# since it could then change again without its (coarse-grained) times
+# changing.
+_ad_racyDirectoryListingNanoseconds = 2 * 1000 * 1000 * 1000
+
 # The basename of the file to which to write the process ID (PID) of the
 # daemon process that processes commands to change music files' ratings.
 _ad_changeRatingPidFilename = "change-ratings.pid"
@@ -64,9 +123,9 @@ _ad_mpdDisplayInformationPidFilename = "mpd-display-info.pid"
 # build.
 _ad_dismantleScriptFilename = "dismantle-music-directory"
 
-# A list of the basenames of the miscellaneous scripts that are symlinked
-# under a music directory's "binaries" subdirectory.
-_ad_miscellaneousScriptsFilenames = ["create-playlist",
+# The basenames of the miscellaneous scripts that are symlinked under a music
+# directory's "binaries" subdirectory.
+_ad_miscellaneousScriptsFilenames = ("create-playlist",
     "maintain-cache-directory", "mpd-add-tracks", "mpd-create-database",
     "mpd-decrease-rating", "mpd-increase-rating", "mpd-set-rating",
     "mpd-hide-current-track-info", "mpd-show-current-track-info",
@@ -74,15 +133,25 @@ _ad_miscellaneousScriptsFilenames = ["create-playlist",
     "mpd-speak-current-track-info",
     "preload-audio-files", "refresh-ratings-files",
     "activate-music-directory", "deactivate-music-directory",
-    "catalogue-music-directory"]
+    "catalogue-music-directory")
 
 
-# The format of the command used to unmount a filesystem.
-_fs_unmountCommandFormat = _conf.fusermountProgram + ' -uq "%s"'
+# The command used to unmount a filesystem, minus the filesystem's mount
+# point, as a list of the program and its arguments. (The configured program
+# is split the same way that the shell would split it.)
+_ad_unmountCommand = shlex.split(_conf.fusermountProgram) + ["-uq"]
 
 # The verbosity-related command line options.
 _ad_verbosityOptions = "[-QSV] [--quiet|--silent|--verbose]"
 
+# A map from each of the verbosity-related command line options to the
+# verbosity level that it specifies.
+_ad_verbosityOptionToLevelMap = {
+    "-V": VERBOSE, "--verbose": VERBOSE,
+    "-Q": QUIET, "--quiet": QUIET,
+    "-S": SILENT, "--silent": SILENT
+}
+
 # A description of the verbosity-related command line options.
 _ad_verbosityOptionsDescription = """
     --silent or -S prevents anything from being output to
@@ -102,8 +171,30 @@ always written to standard output and error messages are always
 written to standard error.)"""
 
 
+# The format of the usage messages of music directory programs. (The parts
+# that are the same for all of those programs are filled in here, once.)
+_ad_usageMessageFormat = """
+usage: %%(progName)s %%(shortHelpOpts)s %%(longHelpOpts)s %s %%(otherOpts)s
+
+%%(mainUsage)s%%(otherOptionsDesc)s
+%%(helpOptionsDesc)s
+The other options are:
+%s
+""" % (_ad_verbosityOptions.replace("%", "%%"),
+       _ad_verbosityOptionsDescription.replace("%", "%%"))
+
+
 # Functions.
 
+# A memoized version of ut.ut_expandedAbsolutePathname(), since we expand the
+# same configured pathnames every time we (re)build a music directory.
+#
+# Note: this assumes that the current directory doesn't change while we're
+# running (or at least that none of the pathnames expanded using it are
+# relative).
+_ad_expandedAbsolutePathname = \
+    functools.lru_cache(maxsize = None)(ut.ut_expandedAbsolutePathname)
+
 def ad_verbosityOptions():
     """
     Returns a string consisting of the verbosity-related command line
@@ -135,31 +226,139 @@ def ad_parseVerbosityOptions(cmdArgs):
     Note: if no verbosity-related options are in 'cmdArgs' then the default
     verbosity level 'NORMAL_VERBOSITY' will be the first item in the returned
     pair.
+
+    Note: each verbosity-related option must be a separate argument (so
+    '-VQ' is NOT treated as '-V -Q'), and long options can't be abbreviated.
     """
     assert cmdArgs is not None
     otherArgs = []
     verbosity = NORMAL_VERBOSITY
-    args = None
-    try:
-        opts, args = getopt.getopt(cmdArgs, "VSQ",
-                                   ["verbose", "silent", "quiet"])
-        for opt, val in opts:
-            if opt in ("-V", "--verbose"):
-                verbosity = VERBOSE
-            elif opt in ("-Q", "--quiet"):
-                verbosity = QUIET
-            elif opt in ("-S", "--silent"):
-                verbosity = SILENT
-    except getopt.GetoptError, ex:
-        otherArgs.append(ex.opt)
-    if args:
-        otherArgs.extend(args)
+    levels = _ad_verbosityOptionToLevelMap
+    for arg in cmdArgs:
+        level = levels.get(arg)
+        if level is None:
+            otherArgs.append(arg)
+        else:
+            verbosity = level
     result = (verbosity, otherArgs)
     assert len(result) == 2
     assert result[0] >= 0
     assert result[1] is not None
     return result
 
+@functools.lru_cache(maxsize = 1)
+def _ad_nonAudioExtensions(exts):
+    """
+    Returns a frozenset of the full, lowercase versions of the file
+    extensions in the tuple 'exts' (which are usually the configured
+    non-audio file extensions).
+
+    Note: the extensions are lowercased since file extensions' case is
+    usually ignored, and the result is memoized since the configured
+    extensions don't change.
+    """
+    assert exts is not None
+    result = frozenset([ut.ut_fullExtension(e).lower() for e in exts])
+    assert result is not None
+    return result
+
+def _ad_directoryListing(d, listings = None):
+    """
+    Returns a list containing a (name, isDir, isFile) triple for each entry
+    in the directory with pathname 'd', where 'name' is the entry's name and
+    'isDir' and 'isFile' indicate whether it is (or is a symlink to) a
+    directory or a regular file, respectively.
+
+    If 'listings' isn't None then it's the _ad_DirectoryListingsCache from
+    which the listing is obtained iff 'd' hasn't changed since it was
+    cached, and to which it's added iff it can be cached.
+    """
+    assert d is not None
+    # 'listings' may be None
+    if listings is not None:
+        (key, stamp, result) = listings.ad_lookUp(d)
+        if result is not None:
+            return result
+    (result, hasSymlinks) = _ad_scanDirectory(d)
+
+    # Note: a symlink's target can change without the directory that
+    # contains it changing, so listings that include them aren't cached.
+    if listings is not None and not hasSymlinks:
+        listings.ad_remember(key, stamp, result)
+    assert result is not None
+    return result
+
+
+def _ad_scanDirectory(d):
+    """
+    Returns a pair whose first item is a list containing a
+    (name, isDir, isFile) triple for each entry in the directory with
+    pathname 'd' - as described in _ad_directoryListing() - and whose
+    second item is True iff any of the entries is a symlink.
+
+    An OSError is raised if 'd' can't be read.
+    """
+    assert d is not None
+    listing = []
+    hasSymlinks = False
+
+    # Note: we use scandir() since its entries can usually tell whether
+    # they're directories or files without having to stat() them (except
+    # for symlinks, whose targets still have to be stat()ed).
+    with os.scandir(d) as entries:
+        for e in entries:
+            listing.append((e.name, e.is_dir(), e.is_file()))
+            if not hasSymlinks:
+                hasSymlinks = e.is_symlink()
+    result = (listing, hasSymlinks)
+    assert result[0] is not None
+    return result
+
+def _ad_audioFilenames(names, nonAudioExts):
+    """
+    Returns a list of those of the filenames in the list 'names' whose
+    extensions - ignoring case - aren't in 'nonAudioExts', a set of
+    lowercase extensions that each start with os.extsep.
+
+    Note: like os.path.splitext(), a filename's leading os.extsep(s) don't
+    start an extension.
+    """
+    assert names is not None
+    assert nonAudioExts is not None
+    extsep = os.extsep
+
+    # Note: all of the extensions are lowercased at once - by lowercasing
+    # them all joined together by a NUL character, which can't appear in a
+    # filename - rather than one at a time.
+    parts = [f.rpartition(extsep) for f in names]
+    exts = "\0".join([p[2] for p in parts]).lower().split("\0")
+    result = [f for (f, (base, sep, ignored), ext) in zip(names, parts, exts)
+                if not (base.lstrip(extsep) and
+                        (sep + ext) in nonAudioExts)]
+    assert result is not None
+    return result
+
+def _ad_prefetchFileStatuses(paths):
+    """
+    Obtains - and then discards - the status of each of the files whose
+    pathnames are in 'paths', so that their inodes will be cached by the
+    kernel: failures to obtain a file's status are ignored.
+    """
+    assert paths is not None
+    stat = os.stat
+    for p in paths:
+        try:
+            stat(p)
+        except OSError:
+            pass  # this is just an optimization
+
+# Use the compiled versions of some of the above functions instead iff
+# they're available.
+try:
+    from audiofs._adminspeedups import _ad_scanDirectory, _ad_audioFilenames
+except ImportError:
+    pass  # just use the pure Python versions
+
 
 # Classes.
 
@@ -190,31 +389,36 @@ class ad_AbstractMusicDirectoryProgram(ut.ut_AbstractProgram):
         assert longHelpOpts is not None
         assert helpOptionsDesc is not None
 
-        result = """
-usage: %(progName)s %(shortHelpOpts)s %(longHelpOpts)s %(verbosityOpts)s %(otherOpts)s
-
-%(mainUsage)s%(otherOptionsDesc)s
-%(helpOptionsDesc)s
-The other options are:
-%(verbosityOptsDesc)s
-""" % { "progName": progName, "shortHelpOpts": shortHelpOpts,
-        "longHelpOpts": longHelpOpts, "verbosityOpts": ad_verbosityOptions(),
-        "mainUsage": self._ad_mainUsageDescription(),
-        "helpOptionsDesc": helpOptionsDesc,
-        "verbosityOptsDesc": ad_verbosityOptionsDescription(),
-        "otherOpts": self._ad_otherOptionsUsage(),
-        "otherOptionsDesc": self._ad_otherOptionsDescription() }
+        result = _ad_usageMessageFormat % { "progName": progName,
+            "shortHelpOpts": shortHelpOpts, "longHelpOpts": longHelpOpts,
+            "mainUsage": self._ad_mainUsageDescription(),
+            "helpOptionsDesc": helpOptionsDesc,
+            "otherOpts": self._ad_otherOptionsUsage(),
+            "otherOptionsDesc": self._ad_otherOptionsDescription() }
         assert result is not None
         return result
 
     def _shortOptions(self):
-        result = "VSQ" + self._ad_otherShortOptions()
+        # Our short options are the same for all instances of a class, so we
+        # only build them once per class.
+        cls = self.__class__
+        result = cls.__dict__.get("_ad_classShortOptions")
+        if result is None:
+            result = "VSQ" + self._ad_otherShortOptions()
+            cls._ad_classShortOptions = result
         assert result is not None
         return result
 
     def _longOptionsList(self):
-        result = ["verbose", "silent", "quiet"]
-        result.extend(self._ad_otherLongOptionsList())
+        # See _shortOptions().
+        cls = self.__class__
+        opts = cls.__dict__.get("_ad_classLongOptions")
+        if opts is None:
+            opts = ["verbose", "silent", "quiet"]
+            opts.extend(self._ad_otherLongOptionsList())
+            opts = tuple(opts)
+            cls._ad_classLongOptions = opts
+        result = list(opts)
         assert result is not None
         return result
 
@@ -229,17 +433,11 @@ The other options are:
         # 'val' may be None
         assert argsMap is not None
         result = True
-        verbosity = None
-        if opt in ("-V", "--verbose"):
-            verbosity = VERBOSE
-        elif opt in ("-Q", "--quiet"):
-            verbosity = QUIET
-        elif opt in ("-S", "--silent"):
-            verbosity = SILENT
-        else:
-            result = self._ad_processOtherOption(opt, val, argsMap)
+        verbosity = _ad_verbosityOptionToLevelMap.get(opt)
         if verbosity is not None:
             argsMap["verbosity"] = verbosity
+        else:
+            result = self._ad_processOtherOption(opt, val, argsMap)
         return result
 
     def _processNonOptionArguments(self, args, argsMap):
@@ -261,7 +459,7 @@ The other options are:
         a = ad_MusicDirectoryAdministrator(argsMap["verbosity"])
         try:
             self._ad_administer(a, argsMap)
-        except ad_FatalAdminError, ex:
+        except ad_FatalAdminError as ex:
             self._fail(str(ex))
             result = 2
         assert result >= 0
@@ -346,11 +544,29 @@ class ad_MusicDirectoryAdministrator(object):
     Represents objects used to administer a music directory.
     """
 
+    # Note: if you add an attribute to this class then you'll need to add
+    # its name here too.
+    __slots__ = ("_ad_verbosity", "_ad_changeRatingPidFile",
+                 "_ad_mpdDisplayInformationPidFile",
+                 "_ad_doDisplayMpdInformation", "_ad_cachedMetadataManager")
+
     def __init__(self, verbosity = NORMAL_VERBOSITY):
         assert verbosity in _ad_allVerbosityLevels
         self._ad_verbosity = verbosity
         object.__init__(self)
 
+        # These are all fixed by the configuration, so we only work them out
+        # once.
+        sysDir = _conf.systemDir
+        self._ad_changeRatingPidFile = os.path.join(sysDir,
+                                                _ad_changeRatingPidFilename)
+        self._ad_mpdDisplayInformationPidFile = os.path.join(sysDir,
+                                        _ad_mpdDisplayInformationPidFilename)
+        self._ad_doDisplayMpdInformation = \
+            (_conf.mpdDisplayInformationProgram is not None)
+        self._ad_cachedMetadataManager = None
+            # see _ad_metadataManager()
+
 
     def ad_buildMusicDirectory(self, doGenerateDocs = False,
                                doGeneratePlaylists = False):
@@ -383,7 +599,7 @@ class ad_MusicDirectoryAdministrator(object):
         # the music search filesystem.
         self._ad_report("Refreshing metadata, ratings, etc. files from the "
                         "catalogue ...")
-        mm = musicfs.fs_MusicMetadataManager()
+        mm = self._ad_metadataManager()
         mm.fs_refreshAllMetadataFilesFromCatalogue()
 
         self._ad_mountAudioFilesystems()
@@ -414,7 +630,7 @@ class ad_MusicDirectoryAdministrator(object):
             if doGenerateDocs:
                 self._ad_report("Generating documentation ...")
                 mm.fs_generateDocumentation()
-        self._ad_report("\nSuccessfully created '%s' and its contents.\n" %
+        self._ad_report("\nSuccessfully created '%s' and its contents.\n",
                         rootDir)
 
     def ad_dismantleMusicDirectory(self):
@@ -463,6 +679,21 @@ class ad_MusicDirectoryAdministrator(object):
             self._ad_unmountFilesystem(mp)
 
 
+    def _ad_metadataManager(self):
+        """
+        Returns the musicfs.fs_MusicMetadataManager that we use to manage
+        the music directory's metadata, creating it the first time that
+        this method is called.
+        """
+        result = self._ad_cachedMetadataManager
+        if result is None:
+            import audiofs.musicfs as musicfs
+            result = musicfs.fs_MusicMetadataManager()
+            self._ad_cachedMetadataManager = result
+        assert result is not None
+        return result
+
+
     def _ad_checkRootDirectoryIsEmptyAndChangeable(self, rootDir):
         """
         Checks that the pathname 'rootDir' of a music directory's root
@@ -472,14 +703,17 @@ class ad_MusicDirectoryAdministrator(object):
         assert rootDir is not None
         if not os.path.isdir(rootDir):
             self._ad_die("The root directory '%s'\neither doesn't exist or "
-                "isn't a directory." % rootDir)
+                "isn't a directory.", rootDir)
         if not ut.ut_isDirectoryFullyChangeable(rootDir):
             self._ad_die("The root directory '%s'\nisn't fully changeable: "
-                "reading and/or writing and/or searching\nit will fail." %
+                "reading and/or writing and/or searching\nit will fail.",
                 rootDir)
-        if len(os.listdir(rootDir)) > 0:
+        with os.scandir(rootDir) as entries:
+            isEmpty = (next(entries, None) is None)
+                # so we only read as much of 'rootDir' as we need to
+        if not isEmpty:
             self._ad_die("The root directory '%s'\nmust be empty but "
-                "isn't." % rootDir)
+                "isn't.", rootDir)
 
     def _ad_populateRealSubdirectoryFromDataDirectories(self, realDir,
                                                         dataDirs):
@@ -490,26 +724,64 @@ class ad_MusicDirectoryAdministrator(object):
         are in 'dataDirs'.
 
         If any part of populating 'realDir' fails it will die() with a
-        message describing why it failed.
+        message describing why it failed, and 'realDir' won't have been
+        created.
+
+        Note: everything is actually built under a temporary sibling of
+        'realDir' that is only renamed to 'realDir' once it's complete, so
+        'realDir' never exists in a partially-populated state.
         """
         assert realDir is not None
         assert dataDirs is not None
         #assert "each entry in 'dataDirs' is not None
-        oldCwd = os.getcwd()
+        links = []
+
+        # Note: this is what os.path.abspath() does, except that we only get
+        # the current directory once.
+        cwd = os.getcwd()
+        absolute = lambda p: os.path.normpath(os.path.join(cwd, p))
+        realDir = absolute(realDir)
+        newDir = _ad_newRealDirectoryFormat % (realDir, os.getpid())
+        listings = _ad_DirectoryListingsCache(os.path.join(
+            _ad_expandedAbsolutePathname(_conf.sourceMetadataDir),
+            _ad_directoryListingsCacheFilename))
         try:
             for dd in dataDirs:
-                self._ad_report("Processing data directory '%s' ..." % dd)
+                self._ad_report("Processing data directory '%s' ...", dd)
                 if not os.path.isdir(dd):
                     self._ad_die("The data directory '%s'\neither doesn't "
-                        "exist or isn't a directory." % dd)
+                        "exist or isn't a directory.", dd)
                 if not ut.ut_isDirectoryFullyAccessible(dd):
                     self._ad_die("The data directory '%s'\nisn't fully "
                         "accessible: reading and/or searching it will "
-                        "fail." % dd)
-                os.chdir(dd)
-                self._ad_createDataDirectorySubtreeAnalogue(".", realDir)
-        finally:
-            os.chdir(oldCwd)
+                        "fail.", dd)
+                self._ad_createDataDirectorySubtreeAnalogue(absolute(dd),
+                                                    newDir, links, listings)
+            self._ad_report("Creating symlinks to the files in the data "
+                            "directories ...")
+            self._ad_createSymlinksConcurrently(links)
+            try:
+                listings.ad_save()
+            except (OSError, ValueError) as ex:
+                self._ad_report("Failed to save the data directories' "
+                                "listings: %s", ex)
+
+            # Note: the symlinks all link to absolute pathnames, so they're
+            # unaffected by the renaming.
+            self._ad_createDirectory(newDir)  # in case 'dataDirs' is empty
+            try:
+                os.rename(newDir, realDir)
+            except OSError as ex:
+                self._ad_die("Couldn't rename the directory '%s'\nto '%s': "
+                             "%s", newDir, realDir, str(ex))
+        except:
+            if os.path.lexists(newDir):
+                try:
+                    ut.ut_deleteTree(newDir)
+                except OSError as ex:
+                    self._ad_report("Failed to delete the partially-built "
+                                    "directory '%s': %s", newDir, ex)
+            raise
 
     def _ad_populateBaseDirectoryFromRealDirectory(self, realDir, baseDir):
         """
@@ -525,9 +797,13 @@ class ad_MusicDirectoryAdministrator(object):
 
         # Create a subdirectory under the base directory for each
         # direct subdirectory of 'realDir'.
-        for d in os.listdir(realDir):
-            if os.path.isdir(os.path.join(realDir, d)):
-                self._ad_createDirectory(os.path.join(baseDir, d))
+        #
+        # Note: we use scandir() since it can usually tell whether an entry
+        # is a directory without having to stat() it.
+        with os.scandir(realDir) as entries:
+            for e in entries:
+                if e.is_dir():
+                    self._ad_createDirectory(os.path.join(baseDir, e.name))
 
         # If there's a 'mainKindAndFormatSubdir' under the 'realDir' then
         # create a corresponding symlink to it under 'baseDir'.
@@ -540,7 +816,7 @@ class ad_MusicDirectoryAdministrator(object):
             self._ad_createSymlink(src, dest)
         else:
             self._ad_report("The main kind and format directory '%s' "
-                            "doesn't exist." % src)
+                            "doesn't exist.", src)
 
     def _ad_createOtherFilesDirectoryStructure(self, otherDir):
         """
@@ -553,25 +829,26 @@ class ad_MusicDirectoryAdministrator(object):
         assert otherDir is not None
         self._ad_report("Creating 'other' directory and its "
                         "subdirectories ...")
+        c = _conf
         self._ad_createDirectory(otherDir)
-        binDir = _conf.binDir
+        binDir = c.binDir
         self._ad_createDirectory(binDir)
-        self._ad_createDirectory(_conf.systemDir)
-        self._ad_createDirectory(_conf.documentationDir)
+        self._ad_createDirectory(c.systemDir)
+        self._ad_createDirectory(c.documentationDir)
         self._ad_createBinariesSymlinks(binDir)
         self._ad_report("Creating a symlink to the metadata directory ...")
-        d = ut.ut_expandedAbsolutePathname(_conf.sourceMetadataDir)
-        self._ad_createSymlink(d, _conf.metadataDir)
-        self._ad_createDirectory(_conf.playlistsDir)
-        self._ad_createDirectory(_conf.generatedPlaylistsDir)
+        d = _ad_expandedAbsolutePathname(c.sourceMetadataDir)
+        self._ad_createSymlink(d, c.metadataDir)
+        self._ad_createDirectory(c.playlistsDir)
+        self._ad_createDirectory(c.generatedPlaylistsDir)
         self._ad_report("Creating a symlink to the custom playlists "
                         "directory ...")
-        d = ut.ut_expandedAbsolutePathname(_conf.sourcePlaylistsDir)
-        self._ad_createSymlink(d, _conf.customPlaylistsDir)
+        d = _ad_expandedAbsolutePathname(c.sourcePlaylistsDir)
+        self._ad_createSymlink(d, c.customPlaylistsDir)
         self._ad_report("Creating a symlink to the ratings directory ...")
-        d = ut.ut_expandedAbsolutePathname(_conf.sourceRatingsDir)
-        self._ad_createSymlink(d, _conf.ratingsDir)
-        self._ad_createDirectory(_conf.searchDir)
+        d = _ad_expandedAbsolutePathname(c.sourceRatingsDir)
+        self._ad_createSymlink(d, c.ratingsDir)
+        self._ad_createDirectory(c.searchDir)
 
     def _ad_createBinariesSymlinks(self, binDir):
         """
@@ -583,39 +860,41 @@ class ad_MusicDirectoryAdministrator(object):
 
         # Symlink (the real path of) this script and the associated
         # 'dismantle' script.
+        #
+        # Note: realpath() always returns an absolute pathname, so 'f' and
+        # 'ourDir' are both absolute.
         f = os.path.realpath(sys.argv[0])
         assert not ut.ut_doesEndWithPathnameSeparator(f)
             # since realpath() will remove it
         (ourDir, ourName) = os.path.split(f)
-        self._ad_report("Creating symlinks to music directory build and "
-                        "dismantle scripts ...")
-        af = os.path.abspath(f)
-        self._ad_createSymlink(af, os.path.join(binDir, ourName))
-        self._ad_createSymlink(af, os.path.join(binDir,
-                                        _ad_dismantleScriptFilename))
+        join = os.path.join
+        report = self._ad_report
+        createSymlinks = self._ad_createSymlinks
+        report("Creating symlinks to music directory build and dismantle "
+               "scripts ...")
+        createSymlinks([(f, join(binDir, ourName)),
+                        (f, join(binDir, _ad_dismantleScriptFilename))])
 
         # Symlink (the real path of) each of the filesystem scripts.
-        ourDir = os.path.abspath(ourDir)
-        for name in _conf.allFilesystemFilenames:
-            self._ad_report("Creating symlink to filesystem script "
-                            "'%s' ..." % name)
-            self._ad_createSymlink(os.path.join(ourDir, name),
-                                   os.path.join(binDir, name))
+        names = _conf.allFilesystemFilenames
+        report("Creating symlinks to the filesystem scripts %s ...",
+               ", ".join(["'%s'" % n for n in names]))
+        createSymlinks([(join(ourDir, n), join(binDir, n)) for n in names])
 
         # Symlink miscellaneous scripts into the 'bin' subdirectory.
-        self._ad_report("Creating symlinks to miscellaneous scripts ...")
-        for name in _ad_miscellaneousScriptsFilenames:
-            self._ad_createSymlink(os.path.join(ourDir, name),
-                                   os.path.join(binDir, name))
+        report("Creating symlinks to miscellaneous scripts ...")
+        createSymlinks([(join(ourDir, n), join(binDir, n))
+                        for n in _ad_miscellaneousScriptsFilenames])
 
     def _ad_buildCaches(self):
         """
         Build the caches: that is, ensure that the cache directories exist.
         """
         # Create the cache directories iff they don't already exist. (The
-        # list may contain duplicates, but it doesn't hurt to try to create
-        # the directory more than once.)
-        for d in _conf.allCacheDirs:
+        # list may contain duplicates, so we skip them - preserving the
+        # order of the rest - rather than trying to create a directory more
+        # than once.)
+        for d in dict.fromkeys(_conf.allCacheDirs):
             self._ad_createDirectory(d)
 
     def _ad_mountAudioFilesystems(self):
@@ -623,23 +902,21 @@ class ad_MusicDirectoryAdministrator(object):
         Mounts the filesystems that transmogrify one type and kind of audio
         file into another.
         """
-        binDir = _conf.binDir
-        commonOpts = _conf.commonMountOptions
-        if commonOpts:
-            commonOpts += ","
-        optsFmt = commonOpts + 'albums=%s,cache=%s'
-        realDir = _conf.flactrackRealDir
+        c = _conf
+        binDir = c.binDir
+        optsFmt = _ad_commonMountOptionsPrefix + 'albums=%s,cache=%s'
+        realDir = c.flactrackRealDir
+        albumsDir = c.flactrackAlbumsDir
+        cacheDir = c.flactrackCacheDir
         if os.path.isdir(realDir):
             optsFmt += _ad_realOptsPart
-            opts = optsFmt % (_conf.flactrackAlbumsDir,
-                              _conf.flactrackCacheDir, realDir)
+            opts = optsFmt % (albumsDir, cacheDir, realDir)
         else:
-            opts = optsFmt % (_conf.flactrackAlbumsDir,
-                              _conf.flactrackCacheDir)
-        self._ad_mountFilesystem(binDir, _conf.flactrackFilename, opts,
-                                 _conf.flactrackMountPoint)
-        self._ad_mountFlacToMp3Filesystems(binDir, commonOpts)
-        self._ad_mountFlacToOggFilesystems(binDir, commonOpts)
+            opts = optsFmt % (albumsDir, cacheDir)
+        self._ad_mountFilesystem(binDir, c.flactrackFilename, opts,
+                                 c.flactrackMountPoint)
+        self._ad_mountFlacToMp3Filesystems(binDir)
+        self._ad_mountFlacToOggFilesystems(binDir)
 
 
     def _ad_mountMusicSearchFilesystem(self):
@@ -650,71 +927,68 @@ class ad_MusicDirectoryAdministrator(object):
         """
         c = _conf
         if c.isNonemptySearchDirectory():
-            import musicsearchfs
+            import audiofs.musicfs as musicfs
+            import audiofs.musicsearchfs as musicsearchfs
                 # we do this here to avoid requiring search-specific
                 # dependencies when there's no music search directory
             tags = c.searchableTagNames
-            commonOpts = _conf.commonMountOptions
-            if commonOpts:
-                commonOpts += ","
-            optsFmt = commonOpts + 'db=%s,tags=%s,base=%s'
+            optsFmt = _ad_commonMountOptionsPrefix + 'db=%s,tags=%s,base=%s'
             opts = optsFmt % (musicfs.fs_searchDatabasePathname(),
                               musicsearchfs.fs_tagSeparator.join(tags),
                               _conf.rootDir)
             self._ad_mountFilesystem(c.binDir, c.musicsearchFilename, opts,
                                      c.searchDir)
 
-    def _ad_mountFlacToMp3Filesystems(self, binDir, commonOpts):
+    def _ad_mountFlacToMp3Filesystems(self, binDir):
         """
         Mounts any and all flac2mp3 filesystems.
         """
         assert binDir is not None
-        assert commonOpts is not None
         c = _conf
-        optsFmt = commonOpts + 'bitrate=%i,flac=%s,cache=%s'
         realDir = c.flac2mp3RealDir
-        flacDir = c.flac2mp3FlacDir
-        cacheDir = c.flac2mp3CacheDir
-        isRealDir = os.path.isdir(realDir)
-        if isRealDir:
-            optsFmt += _ad_realOptsPart
+
+        # Only the bitrate differs between the filesystems' options, so we
+        # build the rest of the options just once.
+        tail = ',flac=%s,cache=%s' % (c.flac2mp3FlacDir, c.flac2mp3CacheDir)
+        if os.path.isdir(realDir):
+            tail += _ad_realOptsPart % realDir
         fname = c.flac2mp3Filename
-        for (mp, bitrate) in c.flac2mp3MountPointToBitrateMap.items():
-            if isRealDir:
-                opts = optsFmt % (bitrate, flacDir, cacheDir, realDir)
-            else:
-                opts = optsFmt % (bitrate, flacDir, cacheDir)
-            self._ad_mountFilesystem(binDir, fname, opts, mp)
+        mountPointToBitrateMap = c.flac2mp3MountPointToBitrateMap
+        prefix = _ad_commonMountOptionsPrefix
+        mount = self._ad_mountFilesystem
+        for (mp, bitrate) in mountPointToBitrateMap.items():
+            opts = '%sbitrate=%i%s' % (prefix, bitrate, tail)
+            mount(binDir, fname, opts, mp)
 
-    def _ad_mountFlacToOggFilesystems(self, binDir, commonOpts):
+    def _ad_mountFlacToOggFilesystems(self, binDir):
         """
         Mounts any and all flac2ogg filesystems.
         """
         assert binDir is not None
-        assert commonOpts is not None
         c = _conf
-        optsFmt = commonOpts + 'bitrate=%i,flac=%s,cache=%s'
         realDir = c.flac2oggRealDir
-        flacDir = c.flac2oggFlacDir
-        cacheDir = c.flac2oggCacheDir
-        isRealDir = os.path.isdir(realDir)
-        if isRealDir:
-            optsFmt += _ad_realOptsPart
+
+        # Only the bitrate differs between the filesystems' options, so we
+        # build the rest of the options just once.
+        tail = ',flac=%s,cache=%s' % (c.flac2oggFlacDir, c.flac2oggCacheDir)
+        if os.path.isdir(realDir):
+            tail += _ad_realOptsPart % realDir
         fname = c.flac2oggFilename
-        for (mp, bitrate) in c.flac2oggMountPointToBitrateMap.items():
-            if isRealDir:
-                opts = optsFmt % (bitrate, flacDir, cacheDir, realDir)
-            else:
-                opts = optsFmt % (bitrate, flacDir, cacheDir)
-            self._ad_mountFilesystem(binDir,fname, opts, mp)
+        mountPointToBitrateMap = c.flac2oggMountPointToBitrateMap
+        prefix = _ad_commonMountOptionsPrefix
+        mount = self._ad_mountFilesystem
+        for (mp, bitrate) in mountPointToBitrateMap.items():
+            opts = '%sbitrate=%i%s' % (prefix, bitrate, tail)
+            mount(binDir, fname, opts, mp)
 
 
     def ad_startRatingsChangeDaemon(self):
         """
         Starts the ratings change daemon process.
         """
+        import audiofs.musicfs as musicfs
         cmdSink = musicfs.fs_changeRatingCommandSink()
-        if os.path.exists(cmdSink):
+        if os.path.lexists(cmdSink):
             self._ad_report("The FIFO to which to write commands to change "
                             "ratings already exists.")
         else:
@@ -728,18 +1002,17 @@ class ad_MusicDirectoryAdministrator(object):
         """
         Stops the ratings change daemon process.
         """
-        pidFile = self._ad_changeRatingPidPathname()
-        self._ad_stopProcess(pidFile, "ratings change daemon")
-        self._ad_tryToDeleteFile(pidFile)
-        cmdSink = musicfs.fs_changeRatingCommandSink()
-        self._ad_tryToDeleteFile(cmdSink)
+        import audiofs.musicfs as musicfs
+        self._ad_stopDaemon("ratings change daemon",
+                            self._ad_changeRatingPidPathname(),
+                            musicfs.fs_changeRatingCommandSink())
 
     def _ad_changeRatingPidPathname(self):
         """
         Returns the pathname of the file that contains the PID of the ratings
         change daemon process (iff it's currently running).
         """
-        result = os.path.join(_conf.systemDir, _ad_changeRatingPidFilename)
+        result = self._ad_changeRatingPidFile
         assert result is not None
         return result
 
@@ -749,8 +1022,9 @@ class ad_MusicDirectoryAdministrator(object):
         Starts the MPD current track information display daemon.
         """
         if self._ad_doDisplayMpdCurrentTrackInformation():
+            import audiofs.mpd as mpd
             cmdSink = mpd.mp_displayInformationCommandSink()
-            if os.path.exists(cmdSink):
+            if os.path.lexists(cmdSink):
                 self._ad_report("The FIFO to which to write commands to "
                     "adjust how and whether MPD current track information "
                     "is displayed already exists.")
@@ -770,17 +1044,46 @@ class ad_MusicDirectoryAdministrator(object):
         """
         Stops the MPD current track information display daemon.
         """
-        pidFile = self._ad_mpdDisplayInformationPidPathname()
-        if self._ad_doDisplayMpdCurrentTrackInformation():
-            self._ad_stopProcess(pidFile,
-                             "MPD current track information display daemon")
-        else:
+        doStop = self._ad_doDisplayMpdCurrentTrackInformation()
+        if not doStop:
             self._ad_debug("Didn't attempt to stop the MPD current track "
                 "information display daemon because the configuration "
                 "specified that it wasn't to be used.")
-        self._ad_tryToDeleteFile(pidFile)
-        cmdSink = mpd.mp_displayInformationCommandSink()
-        self._ad_tryToDeleteFile(cmdSink)
+        import audiofs.mpd as mpd
+        self._ad_stopDaemon("MPD current track information display daemon",
+                            self._ad_mpdDisplayInformationPidPathname(),
+                            mpd.mp_displayInformationCommandSink(), doStop)
+
+    def _ad_stopDaemon(self, name, pidFile, cmdSink, doStop = True):
+        """
+        Stops the daemon process named 'name' whose PID is in the file with
+        pathname 'pidFile' iff 'doStop' is True, then deletes 'pidFile' and
+        the daemon's command FIFO with pathname 'cmdSink'.
+
+        Note: the PID file and command FIFO are usually in the same
+        directory, in which case we only look up that directory once (rather
+        than once per operation on the files in it).
+        """
+        assert name
+        assert pidFile is not None
+        assert cmdSink is not None
+        d = os.path.dirname(pidFile)
+        dirFd = None
+        try:
+            dirFd = os.open(d, os.O_RDONLY | os.O_DIRECTORY)
+        except OSError:
+            pass  # we'll just use the full pathnames
+        try:
+            if doStop:
+                self._ad_stopProcess(pidFile, name, dirFd)
+            self._ad_tryToDeleteFile(pidFile, dirFd)
+            if os.path.dirname(cmdSink) == d:
+                self._ad_tryToDeleteFile(cmdSink, dirFd)
+            else:
+                self._ad_tryToDeleteFile(cmdSink)
+        finally:
+            if dirFd is not None:
+                os.close(dirFd)
 
     def _ad_mpdDisplayInformationPidPathname(self):
         """
@@ -788,8 +1091,7 @@ class ad_MusicDirectoryAdministrator(object):
         (PID) of the daemon process that processes commands to adjust how and
         whether information about the current MPD track is displayed.
         """
-        result = _ad_mpdDisplayInformationPidFilename
-        result = os.path.join(_conf.systemDir, result)
+        result = self._ad_mpdDisplayInformationPidFile
         assert result is not None
         return result
 
@@ -798,8 +1100,7 @@ class ad_MusicDirectoryAdministrator(object):
         Returns True iff the configuration specifies that information about
         the default NPD server's current track is to be displayed.
         """
-        prog = _conf.mpdDisplayInformationProgram
-        return (prog is not None)
+        return self._ad_doDisplayMpdInformation
 
 
     def _ad_createReadmeFile(self, d):
@@ -822,28 +1123,48 @@ the following directories:
     %s
 
 """
+        contents = fmt % (os.path.abspath(sys.argv[0]), _conf.binDir,
+                          "\n    ".join(_conf.dataDirs))
+        contents = contents.encode("utf-8")
         f = os.path.join(d, _ad_readmeFilename)
-        if os.path.exists(f):
+
+        # Note: O_EXCL makes creating the file fail iff something with its
+        # pathname already exists, so we don't need to check that first.
+        try:
+            fd = os.open(f, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+        except OSError as ex:
+            if ex.errno != errno.EEXIST:
+                raise
             self._ad_fail("Couldn't create the README file '%s' since\n"
-                "a file with that pathname already exists" % f)
+                "a file with that pathname already exists", f)
         else:
-            w = None
+            # Note: the contents are small, so we write them directly to the
+            # file descriptor rather than through a file object.
             try:
-                w = open(f, 'w')
-                progName = os.path.abspath(sys.argv[0])
-                w.write(fmt % (progName, _conf.binDir,
-                               "\n    ".join(_conf.dataDirs)))
+                while contents:
+                    contents = contents[os.write(fd, contents):]
             finally:
-                ut.ut_tryToCloseAll(w)
+                os.close(fd)
 
-    def _ad_createDataDirectorySubtreeAnalogue(self, srcTopDir, destTopDir):
+    def _ad_createDataDirectorySubtreeAnalogue(self, srcTopDir, destTopDir,
+                                               links, listings = None):
         """
         Creates an analogue for the data directory subtree whose topmost
         directory is 'srcTopDir': the analogue's topmost directory will be
         'destTopDir'. Analogues are NOT created for non-directories that are
         determined to definitely NOT be audio files.
 
-        Note: 'destTopDir' will be created iff it doesn't already exist.
+        Note: the symlinks that are part of the analogue aren't created:
+        instead a (src, dest) pair - both of which are absolute pathnames -
+        is appended to the list 'links' for each of them, so that they can
+        all be created later (see _ad_createSymlinksConcurrently()).
+
+        If 'listings' isn't None then it's the _ad_DirectoryListingsCache
+        that's used to avoid reading directories under 'srcTopDir' that
+        haven't changed since they were last read.
+
+        Note: 'srcTopDir' and 'destTopDir' must both be absolute pathnames,
+        and 'destTopDir' will be created iff it doesn't already exist.
 
         An analogue for a directory under 'srcTopDir' is created by creating
         a corresponding directory with the same name under 'destTopDir'; an
@@ -851,51 +1172,120 @@ the following directories:
         corresponding symbolic link under 'destTopDir' with the same basename
         as 'f' and that links to 'f'.
 
-        Note: we defined this recursive method instead of just using
+        Note: we walk the subtree ourselves instead of just using
         'os.walk()' since the latter doesn't seem to walk down symlinks to
         directories (though it does consider the symlinks themselves to be
         directories).
         """
-        self._ad_debug("---> in createDataDirectorySubtreeAnalogue(%s, %s)" % (srcTopDir, destTopDir))
+        self._ad_debug("---> in createDataDirectorySubtreeAnalogue(%s, %s)",
+                       srcTopDir, destTopDir)
         assert srcTopDir is not None
-        assert not os.path.isabs(srcTopDir)
+        assert os.path.isabs(srcTopDir)
         assert destTopDir is not None
-        exts = _conf.nonAudioFileExtensions
-        nonAudioExts = set([ut.ut_fullExtension(e) for e in exts])
+        assert os.path.isabs(destTopDir)
+        assert links is not None
+        # 'listings' may be None
         self._ad_reallyCreateDataDirectorySubtreeAnalogue(srcTopDir,
-                                                    destTopDir, nonAudioExts)
+                    destTopDir, _ad_nonAudioExtensions(
+                        tuple(_conf.nonAudioFileExtensions)), links, listings)
 
     def _ad_reallyCreateDataDirectorySubtreeAnalogue(self, srcTopDir,
-                                                destTopDir, nonAudioExts):
+                            destTopDir, nonAudioExts, links, listings):
         """
         See createDataDirectorySubtreeAnalogue().
+
+        Note: the analogues of different directories are created by
+        different threads (up to _ad_maxWalkThreads of them at once).
         """
-        self._ad_createDirectory(destTopDir)
-        for f in os.listdir(srcTopDir):
-            src = os.path.join(srcTopDir, f)
-            dest = os.path.join(destTopDir, f)
-            if os.path.isdir(src):
-                if f in _conf.nonAudioSubdirectories:
+        assert srcTopDir is not None
+        assert destTopDir is not None
+        assert nonAudioExts is not None
+        assert links is not None
+        # 'listings' may be None
+        createAnalogue = self._ad_createDirectoryAnalogue
+        with concurrent.futures.ThreadPoolExecutor(
+                                    _ad_maxWalkThreads) as executor:
+            pending = set([executor.submit(createAnalogue, srcTopDir,
+                            destTopDir, nonAudioExts, links, listings)])
+            try:
+                while pending:
+                    (done, pending) = concurrent.futures.wait(pending,
+                            return_when = concurrent.futures.FIRST_COMPLETED)
+                    for f in done:
+                        for (src, dest) in f.result():
+                            pending.add(executor.submit(createAnalogue, src,
+                                        dest, nonAudioExts, links, listings))
+            except:
+                # Don't start on any more directories once one of them has
+                # failed.
+                for f in pending:
+                    f.cancel()
+                raise
+
+    def _ad_createDirectoryAnalogue(self, srcDir, destDir, nonAudioExts,
+                                    links, listings):
+        """
+        Creates the analogue of the directory 'srcDir' - but NOT of any of
+        its subdirectories - as the directory 'destDir', appending a
+        (src, dest) pair to 'links' for each symlink that needs to be
+        created in it.
+
+        Returns a list of (src, dest) pairs, one for each of the
+        subdirectories of 'srcDir' whose analogue still needs to be created
+        (as 'dest').
+
+        See _ad_createDataDirectorySubtreeAnalogue().
+        """
+        assert srcDir is not None
+        assert os.path.isabs(srcDir)
+        assert destDir is not None
+        assert os.path.isabs(destDir)
+        assert nonAudioExts is not None
+        assert links is not None
+        # 'listings' may be None
+        result = []
+        self._ad_createDirectory(destDir)
+        nonAudioSubdirs = _conf.nonAudioSubdirectories
+
+        # Note: we build each 'src' and 'dest' by just appending the entry's
+        # name to 'srcPrefix' and 'destPrefix' (which is how scandir()
+        # builds its entries' pathnames too) rather than calling
+        # os.path.join() once per entry.
+        srcPrefix = os.path.join(srcDir, "")
+        destPrefix = os.path.join(destDir, "")
+        files = []
+        for (f, isDir, isFile) in _ad_directoryListing(srcDir, listings):
+            if isDir:
+                src = srcPrefix + f
+                if f in nonAudioSubdirs:
                     self._ad_debug("    Ignoring the data subdirectory "
-                        "'%s':\n    it is a non-audio subdirectory." % src)
+                        "'%s':\n    it is a non-audio subdirectory.", src)
                 elif ut.ut_isDirectoryFullyAccessible(src):
-                    self._ad_reallyCreateDataDirectorySubtreeAnalogue(src,
-                                                        dest, nonAudioExts)
+                    result.append((src, destPrefix + f))
                 else:
                     self._ad_report("    Ignoring the data subdirectory "
-                        "'%s':\n    reading and/or searching it will fail." %
-                        src)
-            elif os.path.exists(src):
-                (base, ext) = os.path.splitext(f)
-                if ext not in nonAudioExts:
-                    # We symlink to 'src''s absolute pathname.
-                    self._ad_createSymlink(os.path.abspath(src), dest)
-                else:
-                    self._ad_debug("not symlinking '%s' since it isn't an "
-                                   "audio file" % src)
+                        "'%s':\n    reading and/or searching it will "
+                        "fail.", src)
+            elif isFile:
+                files.append(f)
             else:
                 self._ad_debug("not symlinking '%s' since it's a broken "
-                               "link" % src)
+                               "link or isn't a regular file", srcPrefix + f)
+
+        # Note: 'src' and 'dest' are both absolute since 'srcDir' and
+        # 'destDir' are.
+        audioFiles = _ad_audioFilenames(files, nonAudioExts)
+        srcs = [srcPrefix + f for f in audioFiles]
+        links.extend(zip(srcs, [destPrefix + f for f in audioFiles]))
+        if _ad_doPrefetchAudioFileStatuses:
+            _ad_prefetchFileStatuses(srcs)
+        if self._ad_verbosity >= VERBOSE and \
+                len(audioFiles) < len(files):
+            for f in sorted(set(files).difference(audioFiles)):
+                self._ad_debug("not symlinking '%s' since it isn't "
+                               "an audio file", srcPrefix + f)
+        assert result is not None
+        return result
 
 
     def _ad_mountFilesystem(self, scriptsDir, script, opts, mountPoint,
@@ -911,25 +1301,30 @@ the following directories:
         #self._ad_debug("---> in mountFilesystem(%s, %s, %s, %s, %s)" % (scriptsDir, script, str(opts), mountPoint, str(doDebug)))
         if getattr(_conf, 'doMountFilesystems', True):
             self._ad_debug("Creating mount point '%s' if it doesn't "
-                           "already exist." % mountPoint)
+                           "already exist.", mountPoint)
             self._ad_createDirectory(mountPoint)
+
+            # Note: we run the script directly rather than using a shell, so
+            # none of the arguments need to be quoted.
+            cmd = [os.path.join(scriptsDir, script)]
             if doDebug:
-                coreOpts = "-d -o"
-            else:
-                coreOpts = "-o"
-            fmt = '%s ' + coreOpts + ' %s %s'
-            cmd = fmt % (os.path.join(scriptsDir, script), opts, mountPoint)
-            self._ad_debug("Mounting filesystem using the command [%s]" % cmd)
-            result = (ut.ut_executeShellCommand(cmd) is not None)
+                cmd.append("-d")
+            cmd.extend(["-o", opts, mountPoint])
+            self._ad_debug("Mounting filesystem using the command %s", cmd)
+            try:
+                result = (subprocess.call(cmd,
+                                          stdout = subprocess.DEVNULL) == 0)
+            except OSError:
+                result = False  # the script couldn't be run
             if result:
-                self._ad_report("Mounted filesystem on '%s'." % mountPoint)
+                self._ad_report("Mounted filesystem on '%s'.", mountPoint)
             else:
-                self._ad_fail("Failed to mount a filesystem using '%s'" %
+                self._ad_fail("Failed to mount a filesystem using '%s'",
                               script)
         else:
             self._ad_debug("Not mounting a filesystem on '%s' because "
                 "automatic mounting and unmounting of filesystems has been "
-                "disabled.")
+                "disabled.", mountPoint)
             result = True  # considered successful if we're not to mount it.
         return result
 
@@ -940,17 +1335,21 @@ the following directories:
         """
         assert path is not None
         if getattr(_conf, 'doMountFilesystems', True):
-            cmd = _fs_unmountCommandFormat % path
-            if ut.ut_executeShellCommand(cmd) is None:
-                self._ad_fail("Couldn't unmount a filesystem from '%s'" %
-                              path)
+            # Note: we run the command directly rather than using a shell.
+            try:
+                rc = subprocess.call(_ad_unmountCommand + [path],
+                                     stdout = subprocess.DEVNULL)
+            except OSError:
+                rc = None  # the program couldn't be run
+            if rc != 0:
+                self._ad_fail("Couldn't unmount a filesystem from '%s'", path)
             else:
-                self._ad_report("Unmounted the filesystem mounted at '%s'." %
+                self._ad_report("Unmounted the filesystem mounted at '%s'.",
                                 path)
         else:
             self._ad_report("Not unmounting the filesystem on '%s' because "
                 "automatic mounting and unmounting of filesystems has been "
-                "disabled.")
+                "disabled.", path)
 
     def _ad_createDirectory(self, d):
         """
@@ -962,12 +1361,12 @@ the following directories:
         """
         assert d is not None
         try:
-            ut.ut_createDirectory(d)
+            os.makedirs(d, exist_ok = True)
             self._ad_debug("created the subdirectory '%s' (or it already "
-                           "existed)" % d)
-        except OSError, ex:
-            self._ad_die("Couldn't create the subdirectory '%s': "
-                         "%s" % (d, str(ex)))
+                           "existed)", d)
+        except OSError as ex:
+            self._ad_die("Couldn't create the subdirectory '%s': %s", d,
+                         str(ex))
 
     def _ad_createSymlink(self, src, dest):
         """
@@ -978,10 +1377,92 @@ the following directories:
         assert dest is not None
         try:
             os.symlink(src, dest)
-            self._ad_debug("created symlink '%s' ->\n    %s" % (dest, src))
-        except OSError, ex:
+            self._ad_debug("created symlink '%s' ->\n    %s", dest, src)
+        except OSError as ex:
             self._ad_die("Couldn't create the symlink '%s' that\nlinks to "
-                         "'%s': %s" % (dest, src, str(ex)))
+                         "'%s': %s", dest, src, str(ex))
+
+    def _ad_createSymlinks(self, pairs):
+        """
+        Creates a symlink for each (src, dest) pair in 'pairs' with pathname
+        'dest' that links to the file with pathname 'src', or die()s with an
+        appropriate error message as soon as one of them can't be created.
+
+        See _ad_createSymlink().
+        """
+        assert pairs is not None
+        createSymlink = self._ad_createSymlink
+        for (src, dest) in pairs:
+            createSymlink(src, dest)
+
+    def _ad_createSymlinksConcurrently(self, pairs):
+        """
+        Does the same thing as _ad_createSymlinks(), except that several of
+        the symlinks are created at once, so the order in which they're
+        created isn't defined.
+
+        If io_uring can be used to create symlinks then they're submitted to
+        the kernel in batches; otherwise the symlinks in each directory are
+        created together (relative to the directory, so that its pathname
+        is only looked up once), with the symlinks in up to
+        _ad_maxSymlinkThreads directories being created at once.
+
+        Note: all of the pathnames in 'pairs' must be absolute, since other
+        threads may not see the same current directory that we do.
+        """
+        assert pairs is not None
+        if pairs and ur.ur_isOperationSupported('IORING_OP_SYMLINKAT'):
+            self._ad_debug("creating %i symlinks using io_uring", len(pairs))
+            try:
+                ur.ur_symlinkAll(pairs)
+            except OSError as ex:
+                self._ad_die("Couldn't create the symlink '%s' that\nlinks "
+                    "to '%s': %s", ex.filename, ex.filename2, ex.strerror)
+        elif pairs:
+            sep = os.sep
+            dirToPairsMap = {}
+            for (src, dest) in pairs:
+                (d, ignored, name) = dest.rpartition(sep)
+                dirPairs = dirToPairsMap.get(d)
+                if dirPairs is None:
+                    dirPairs = []
+                    dirToPairsMap[d] = dirPairs
+                dirPairs.append((src, name))
+            with concurrent.futures.ThreadPoolExecutor(
+                                        _ad_maxSymlinkThreads) as executor:
+                for res in executor.map(self._ad_createSymlinksInDirectory,
+                        dirToPairsMap.keys(), dirToPairsMap.values()):
+                    pass  # so that any exception is reraised here
+
+    def _ad_createSymlinksInDirectory(self, d, pairs):
+        """
+        Creates a symlink for each (src, name) pair in 'pairs' with basename
+        'name' in the existing directory with pathname 'd' that links to the
+        file with pathname 'src', or die()s with an appropriate error message
+        as soon as one of them can't be created.
+
+        Note: the directory is only opened once, and then each symlink is
+        created relative to it.
+        """
+        assert d is not None
+        assert pairs is not None
+        join = os.path.join
+        try:
+            dirFd = os.open(d, os.O_RDONLY | os.O_DIRECTORY)
+        except OSError as ex:
+            self._ad_die("Couldn't open the directory '%s' to create "
+                         "symlinks in it: %s", d, str(ex))
+        try:
+            for (src, name) in pairs:
+                try:
+                    os.symlink(src, name, dir_fd = dirFd)
+                except OSError as ex:
+                    self._ad_die("Couldn't create the symlink '%s' that\n"
+                        "links to '%s': %s", join(d, name), src, str(ex))
+                self._ad_debug("created symlink '%s' in '%s' ->\n    %s",
+                               name, d, src)
+        finally:
+            os.close(dirFd)
 
     def _ad_deleteEverythingUnderDirectory(self, d):
         """
@@ -991,38 +1472,47 @@ the following directories:
         Returns True iff everything is successfully deleted.
         """
         assert d is not None
-        self._ad_report("Deleting everything under '%s' ..." % d)
+        self._ad_report("Deleting everything under '%s' ...", d)
             # we report this since it may take a while to finish
         if os.path.isdir(d):
             result = True
-            for f in os.listdir(d):
-                path = os.path.join(d, f)
-                try:
-                    if os.path.isdir(path):
-                        ut.ut_deleteTree(path)
-                    else:
-                        os.remove(path)
-                except:
-                    result = False
-                    if os.path.isdir(path):
-                        fmt = "Couldn't delete the directory '%s' (and " + \
-                              "possibly some or all of the files and " + \
-                              "directories under it)"
-                    else:
-                        fmt = "Couldn't delete the file '%s'"
-                    self._ad_fail(fmt % path)
+
+            # Note: we use the entries' cached types to decide how to delete
+            # them, and symlinks (including ones to directories) are deleted
+            # rather than what they link to.
+            with os.scandir(d) as entries:
+                for e in entries:
+                    path = e.path
+                    isDir = e.is_dir(follow_symlinks = False)
+                    try:
+                        if isDir:
+                            ut.ut_deleteTree(path)
+                        else:
+                            os.remove(path)
+                    except:
+                        result = False
+                        if isDir:
+                            fmt = "Couldn't delete the directory '%s' " + \
+                                  "(and possibly some or all of the " + \
+                                  "files and directories under it)"
+                        else:
+                            fmt = "Couldn't delete the file '%s'"
+                        self._ad_fail(fmt, path)
             if result:
-                self._ad_report("Deleted  everything under '%s'." % d)
+                self._ad_report("Deleted  everything under '%s'.", d)
         else:
             result = False
-            self._ad_report("The directory '%s' doesn't exist" % d)
+            self._ad_report("The directory '%s' doesn't exist", d)
         return result
 
-    def _ad_stopProcess(self, pidFile, name):
+    def _ad_stopProcess(self, pidFile, name, dirFd = None):
         """
         Stops the process named 'name' whose PID is the sole contents of (the
         first line of) the file with pathname 'pidFile'.
 
+        If 'dirFd' isn't None then it's a file descriptor for the directory
+        containing 'pidFile', and is used to open 'pidFile' relative to it.
+
         Note: 'name' is only used as the name of the process in error (and
         other) messages.
 
@@ -1033,82 +1523,240 @@ the following directories:
         #self._ad_debug("---> in stopProcess(%s, %s)" % (pidFile, name))
         assert pidFile is not None
         assert name is not None
-        self._ad_report("Stopping the %s ..." % name)
+        self._ad_report("Stopping the %s ...", name)
         result = False
-        if os.path.isfile(pidFile):
-            lines = ut.ut_readFileLines(pidFile)
-            if lines:
-                strPid = lines[0].strip()
+
+        # Note: a PID file's first line is very short, so we just read the
+        # start of the file rather than reading all of it and splitting it
+        # into lines.
+        data = None
+        try:
+            if dirFd is None:
+                fd = os.open(pidFile, os.O_RDONLY)
+            else:
+                fd = os.open(os.path.basename(pidFile), os.O_RDONLY,
+                             dir_fd = dirFd)
+            try:
+                data = os.read(fd, _ad_maxPidFileReadSize)
+            finally:
+                os.close(fd)
+        except OSError as ex:
+            if ex.errno != errno.ENOENT:
+                data = b""  # so it's treated like an empty PID file
+        if data is not None:
+            strPid = data.split(b"\n", 1)[0].strip().decode("ascii",
+                                                            "replace")
+            if strPid:
                 try:
                     pid = ut.ut_parseInt(strPid, minValue = 2)
                 except:
                     self._ad_fail("Stopping the '%s' process failed: the "
                         "first line of the PID file '%s' is '%s', which "
-                        "isn't a valid PID." % (name, pidFile, strPid))
+                        "isn't a valid PID.", name, pidFile, strPid)
                 else:
                     try:
-                        self._ad_debug("about to kill process with ID %i" %
-                                       pid)
+                        self._ad_debug("about to kill process with ID %i", pid)
                         res = ut.ut_tryToKill(pid)
                         self._ad_debug("finished killing process: existed? "
-                                       "%s" % str(res))
+                                       "%s", str(res))
                         result = True
                     except:
                         self._ad_debug("killing the process raised an exception")
                         result = False
             else:
                 self._ad_fail("Stopping the '%s' process failed: there was "
-                    "no PID in the PID file '%s'" % (name, pidFile))
+                    "no PID in the PID file '%s'", name, pidFile)
         else:
             self._ad_fail("The '%s' was not stopped since its PID file '%s' "
-                          "doesn't exist." % (name, pidFile))
+                          "doesn't exist.", name, pidFile)
         return result
 
 
-    def _ad_tryToDeleteFile(self, path):
+    def _ad_tryToDeleteFile(self, path, dirFd = None):
         """
         Tries to delete the file (or directory) with pathname 'path',
         returning True if it's successful, and reporting the failure and
         returning False if it isn't.
+
+        If 'dirFd' isn't None then it's a file descriptor for the directory
+        containing 'path', and 'path' is deleted relative to it.
         """
         assert path is not None
         result = False
+        if dirFd is None:
+            name = path
+        else:
+            name = os.path.basename(path)
+
+        # Note: rather than checking whether 'path' exists and what it is
+        # first, we just try to unlink() it, since it's almost always a file
+        # if it exists. (Linux's unlink() fails with EISDIR iff it's a
+        # directory.)
         try:
-            ut.ut_deleteFileOrDirectory(path)
+            try:
+                os.unlink(name, dir_fd = dirFd)
+            except OSError as ex:
+                if ex.errno == errno.EISDIR:
+                    os.rmdir(name, dir_fd = dirFd)
+                elif ex.errno != errno.ENOENT:
+                    raise
             result = True
-        except OSError, ex:
-            self._ad_report("Failed to delete the file '%s': %s" % (path, ex))
+        except OSError as ex:
+            self._ad_report("Failed to delete the file '%s': %s", path, ex)
         return result
 
-    def _ad_die(self, msg):
+    def _ad_die(self, msg, *args):
         """
-        Writes 'msg' to standard error and then raises a ad_FatalAdminError.
+        Writes 'msg' to standard error and then raises a ad_FatalAdminError,
+        after using the '%' operator to substitute 'args' into 'msg' iff
+        there are any 'args'.
         """
         assert msg is not None
+        if args:
+            msg = msg % args
         if self._ad_verbosity > SILENT:
-            print >> sys.stderr, "\n%s\n" % msg
-        raise ad_FatalAdminError, msg
+            with _ad_outputLock:
+                print("\n%s\n" % msg, file = sys.stderr)
+        raise ad_FatalAdminError(msg)
 
-    def _ad_fail(self, msg):
+    def _ad_fail(self, msg, *args):
         """
         Writes 'msg' to standard error and then returns: we don't exit.
+
+        Any 'args' are substituted into 'msg' in the same way - and with the
+        same laziness - as they are by _ad_report().
         """
         assert msg is not None
         if self._ad_verbosity > SILENT:
-            print >> sys.stderr, msg
+            if args:
+                msg = msg % args
+            with _ad_outputLock:
+                print(msg, file = sys.stderr)
 
-    def _ad_report(self, msg):
+    def _ad_report(self, msg, *args):
         """
-        Writes 'msg' to standard output.
+        Writes 'msg' to standard output, after using the '%' operator to
+        substitute 'args' into it iff there are any 'args'.
+
+        Note: the substitution is only done if 'msg' is actually written,
+        so it's better to pass values to substitute as 'args' than to
+        substitute them before calling this method.
         """
         assert msg is not None
         if self._ad_verbosity > QUIET:
-            print msg
+            if args:
+                msg = msg % args
+            with _ad_outputLock:
+                print(msg)
 
-    def _ad_debug(self, msg):
+    def _ad_debug(self, msg, *args):
         """
-        Writes 'msg' to standard output as debugging information.
+        Writes 'msg' to standard output as debugging information, after
+        substituting 'args' into it iff there are any 'args'.
+
+        See _ad_report().
         """
         assert msg is not None
         if self._ad_verbosity >= VERBOSE:
-            print "DEBUG: " + msg
+            if args:
+                msg = msg % args
+            with _ad_outputLock:
+                print("DEBUG: " + msg)
+
+
+class _ad_DirectoryListingsCache(object):
+    """
+    Represents a persistent cache of the listings of directories, where
+    each listing is only used until the directory that it's a listing of
+    changes.
+
+    Note: directories are identified by their device and inode numbers, and
+    considered to have changed iff their modification or status change
+    times have changed, so the listings of directories that changed just
+    before they were listed aren't remembered (since they could have
+    changed again since then without those times changing). The listings
+    (and times) are the ones obtained when the cache was created, and the
+    cache is only saved - and only contains the listings that were looked
+    up or remembered since it was created - when ad_save() is called.
+
+    Note: an instance can be used by several threads at once.
+    """
+
+    __slots__ = ("_ad_pathname", "_ad_oldListings", "_ad_newListings")
+
+    def __init__(self, pathname):
+        """
+        Initializes us from the file with pathname 'pathname' - which we'll
+        also save ourself to - if it exists and is valid: otherwise we're
+        initially empty.
+        """
+        assert pathname is not None
+        object.__init__(self)
+        self._ad_pathname = pathname
+        self._ad_newListings = {}
+        try:
+            with open(pathname) as r:
+                old = json.load(r)
+            if not isinstance(old, dict):
+                old = {}
+        except (IOError, OSError, ValueError):
+            old = {}  # there's no valid cache yet
+        self._ad_oldListings = old
+
+    def ad_lookUp(self, d):
+        """
+        Returns a triple consisting of the key and stamp that identify the
+        current state of the directory with pathname 'd', followed by our
+        listing of 'd' if it's unchanged, or None if it has changed or
+        we don't have a listing of it.
+
+        See _ad_directoryListing() and ad_remember().
+        """
+        assert d is not None
+        st = os.stat(d)
+        key = "%i:%i" % (st.st_dev, st.st_ino)
+        stamp = [st.st_mtime_ns, st.st_ctime_ns]
+        listing = None
+        rec = self._ad_oldListings.get(key)
+        try:
+            if rec is not None and rec[0] == stamp:
+                listing = [(name, bool(isDir), bool(isFile))
+                           for (name, isDir, isFile) in rec[1]]
+                self._ad_newListings[key] = rec
+        except (IndexError, TypeError, ValueError):
+            listing = None  # the cached listing isn't valid
+        result = (key, stamp, listing)
+        assert result[0] is not None
+        assert result[1] is not None
+        return result
+
+    def ad_remember(self, key, stamp, listing):
+        """
+        Remembers that 'listing' is the listing of the directory whose key
+        and stamp were most recently returned by ad_lookUp() as 'key' and
+        'stamp', respectively, unless the directory changed too recently
+        for its listing to be relied on.
+        """
+        assert key is not None
+        assert stamp is not None
+        assert listing is not None
+        if time.time_ns() - max(stamp) >= _ad_racyDirectoryListingNanoseconds:
+            self._ad_newListings[key] = [stamp, listing]
+
+    def ad_save(self):
+        """
+        Saves the listings that were looked up or remembered since we were
+        created to the file that we were created from, replacing its
+        previous contents.
+
+        Note: the file is replaced atomically, so it's never left partially
+        written.
+        """
+        tmp = "%s.%i" % (self._ad_pathname, os.getpid())
+        try:
+            with open(tmp, "w") as w:
+                json.dump(self._ad_newListings, w, separators = (",", ":"))
+            os.rename(tmp, self._ad_pathname)
+        except:
+            ut.ut_tryToDeleteAll(tmp)
+            raise
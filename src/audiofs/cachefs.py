@@ -19,14 +19,19 @@
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 #
 
+import collections
+import errno
 import os
 import os.path
+import shutil
+import stat
 import sys
 
 import time
 
-from fscommon import *
-import utilities as ut
+from audiofs.fscommon import *
+import audiofs.uringio as ur
+import audiofs.utilities as ut
 
 
 # Constants.
@@ -40,6 +45,41 @@ _fs_defaultCapacityInBytes = 0
 # value of 0 means there's no maximum number of files).
 _fs_defaultMaximumFileCount = 0
 
+# The maximum number of pathnames whose actual files' pathnames are cached
+# (see fs_CachingFilesystem._fs_actualFile()).
+_fs_maxCachedActualFiles = 4096
+
+# The maximum number of bytes that are copied at once when a file is moved
+# from one filesystem to another (see _fs_moveFileAcrossFilesystems()).
+_fs_maxCopyChunkSize = 16 * 1024 * 1024
+
+# The suffix that's appended to the pathname of a file that's being moved
+# to another filesystem to get the pathname of the temporary file that it's
+# copied to.
+_fs_moveTemporaryFileSuffix = ".audiofs-moving"
+
+# The 'errno' values that indicate that copy_file_range() can't be used to
+# copy between two particular files (as opposed to it having failed).
+_fs_copyFileRangeUnsupportedErrnos = frozenset([errno.EXDEV, errno.ENOSYS,
+    errno.EINVAL, errno.EOPNOTSUPP])
+
+
+# The flag(s) that are added to the flags that the files in a cache are
+# opened with so that reading from them doesn't update their last accessed
+# times: we update them ourselves (see _fs_updateFileAccessTime()), so the
+# kernel doing it too is just wasted I/O.
+#
+# Note: O_NOATIME only exists on Linux, and opening a file with it fails
+# with EPERM unless the file is owned by our effective user.
+_fs_noAccessTimeUpdateFlags = getattr(os, "O_NOATIME", 0)
+
+# The 'type' values of the Direntry objects for directories, regular files
+# and symlinks: like the d_type values in the entries that readdir()
+# returns, they're their st_mode's file type bits shifted down by 12 bits.
+# (A value of 0 means that an entry's type is unknown.)
+_fs_directoryDirentryType = stat.S_IFDIR >> 12
+_fs_regularFileDirentryType = stat.S_IFREG >> 12
+_fs_symlinkDirentryType = stat.S_IFLNK >> 12
 
 # The format of the system command to use to "manually" update a file's
 # last accessed time to the current date/time.
@@ -57,31 +97,126 @@ _fs_cacheDirOption = "dir"
 def _fs_updateFileAccessTime(path):
     """
     Updates the last accessed time for the file with pathname 'path' to the
-    current date/time, returning True iff it is successfully set.
+    current date/time, returning True iff it is successfully set (so False
+    is returned if the file doesn't exist).
+
+    Note: the times are set in nanoseconds so that the file's last modified
+    time is left exactly as it was.
     """
     assert path is not None
     result = True
     try:
-        mtime = os.path.getmtime(path)  # keep mtime unchanged
-        os.utime(path, (time.time(), mtime))
-    except:
+        mtime = os.stat(path).st_mtime_ns  # keep mtime unchanged
+        os.utime(path, ns = (time.time_ns(), mtime))
+    except OSError:
         result = False
 #    cmd = _fs_updateAccessTimeCommandFormat % path
 #    result = (ut.ut_executeShellCommand(cmd) is not None)
     return result
 
-def _fs_compareFilesByAccessTime(path1, path2):
+def _fs_nonDirectoryEntries(top):
+    """
+    Returns an iterator over os.DirEntry objects for each of the
+    non-directory files in and under the directory with pathname 'top',
+    in no particular order: they're the same files as are in the lists of
+    filenames generated by os.walk(top).
+
+    Note: unlike os.walk() we use the entries that os.scandir() returns
+    directly, so a file's status can be obtained using its entry's stat()
+    method, which is only done once per entry.
+    """
+    assert top is not None
+    dirs = [top]
+    while dirs:
+        with os.scandir(dirs.pop()) as entries:
+            for e in entries:
+                if not e.is_dir():
+                    yield e
+                elif not e.is_symlink():
+                    dirs.append(e.path)
+                # otherwise it's a symlink to a directory, which os.walk()
+                # wouldn't walk either
+
+def _fs_moveFileAcrossFilesystems(src, dest):
     """
-    Compares the files with pathnames 'path1' and 'path2' based on their
-    last accessed date/times: returns -1/0/1 iff the file with pathname
-    'path1' was last accessed less/equally/more recently than was the file
-    with pathname 'path2'.
+    Moves the (non-directory) file with pathname 'src' to the pathname
+    'dest' in another filesystem (which os.rename() can't do), replacing
+    any existing file with pathname 'dest'.
+
+    The file's contents are copied - preferably within the kernel - to a
+    temporary file in the same directory as 'dest', which is then renamed
+    to 'dest' (so that 'dest' is never partially copied), and then 'src' is
+    removed. The file's permissions and last accessed and modified times
+    are copied too.
     """
-    # Both 'at1' and 'at2' are (big) floating-point numbers.
-    at1 = os.stat(path1).st_atime
-    at2 = os.stat(path2).st_atime
-    result = cmp(at1, at2)
-    assert abs(result) <= 1
+    assert src is not None
+    assert dest is not None
+    tmp = dest + _fs_moveTemporaryFileSuffix
+    inFd = os.open(src, os.O_RDONLY | _fs_noAccessTimeUpdateFlags)
+    try:
+        mode = stat.S_IMODE(os.fstat(inFd).st_mode)
+        outFd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, mode)
+        try:
+            try:
+                _fs_copyFileContents(inFd, outFd)
+            finally:
+                os.close(outFd)
+            shutil.copystat(src, tmp)
+            os.rename(tmp, dest)
+        except:
+            ut.ut_tryToDeleteAll(tmp)
+            raise
+    finally:
+        os.close(inFd)
+    os.remove(src)
+
+def _fs_copyFileContents(inFd, outFd):
+    """
+    Copies the contents of the file with file descriptor 'inFd' - starting
+    at its current offset - to the file with file descriptor 'outFd'.
+
+    Note: the contents are copied within the kernel using
+    copy_file_range() where possible, and by reading and then writing them
+    otherwise.
+    """
+    assert inFd >= 0
+    assert outFd >= 0
+    copyRange = getattr(os, "copy_file_range", None)
+    if copyRange is not None:
+        try:
+            while copyRange(inFd, outFd, _fs_maxCopyChunkSize) > 0:
+                pass
+            return
+        except OSError as ex:
+            if ex.errno not in _fs_copyFileRangeUnsupportedErrnos:
+                raise
+            # Otherwise copy the rest (which is usually all) of the file
+            # below: both files' offsets are just after what's been copied.
+    while True:
+        data = os.read(inFd, _fs_maxCopyChunkSize)
+        if not data:
+            break
+        while data:
+            data = data[os.write(outFd, data):]
+
+def _fs_direntryType(e):
+    """
+    Returns the value of the 'type' of a Direntry that represents the same
+    file as the os.DirEntry 'e' does, or 0 if the type of the file isn't
+    one that we set it for.
+
+    Note: this doesn't stat() the file unless the directory entry that 'e'
+    was created from didn't include the file's type.
+    """
+    assert e is not None
+    if e.is_symlink():
+        result = _fs_symlinkDirentryType
+    elif e.is_dir(follow_symlinks = False):
+        result = _fs_directoryDirentryType
+    elif e.is_file(follow_symlinks = False):
+        result = _fs_regularFileDirentryType
+    else:
+        result = 0
     return result
 
 
@@ -92,18 +227,27 @@ class fs_CachedFile(object):
     Represents a (regular) file in a fs_CachingFilesystem.
     """
 
+    # Note: if you add an attribute to this class then you'll need to add
+    # its name here too (and to the compiled version of this class in the
+    # '_cachefsspeedups' module).
+    __slots__ = ("_fs_fd", "_fs_path", "_fs_startSize", "_fs_sizeChange")
+
     def __init__(self, path, flags, *mode):
         #debug("---> in fs_CachedFile.__init__(%s, %s, %s)" % (path, str(flags), str(mode)))
         object.__init__(self)
-        self._fs_file = os.fdopen(os.open(path, flags, *mode),
-                                  fs_flag2mode(flags))
-        self._fs_path = path
         try:
-            sz = os.path.getsize(path)
-        except OSError:
-            # File 'path' doesn't exist yet.
-            sz = 0
-        self._fs_startSize = sz
+            fd = os.open(path, flags | _fs_noAccessTimeUpdateFlags, *mode)
+        except OSError as ex:
+            if ex.errno != errno.EPERM or not _fs_noAccessTimeUpdateFlags:
+                raise
+            fd = os.open(path, flags, *mode)  # we don't own the file
+
+        # Note: we use our file's descriptor directly (rather than through a
+        # file object) so that each read or write is a single pread() or
+        # pwrite() rather than an lseek() followed by a read() or write().
+        self._fs_fd = fd
+        self._fs_path = path
+        self._fs_startSize = os.fstat(fd).st_size
         self._fs_sizeChange = None
 
     def fs_sizeIncreaseInBytes(self):
@@ -121,40 +265,44 @@ class fs_CachedFile(object):
 
     def read(self, length, offset):
         #debug("---> in fs_CachedFile.read(%i, %i)" % (length, offset))
-        self._fs_file.seek(offset)
-        return self._fs_file.read(length)
+        return os.pread(self._fs_fd, length, offset)
 
     def write(self, buf, offset):
         #debug("---> in fs_CachedFile.write('buf', %i)" % offset)
-        self._fs_file.seek(offset)
-        self._fs_file.write(buf)
-        return len(buf)
+        return os.pwrite(self._fs_fd, buf, offset)
 
     def flush(self):
         #debug("---> in fs_CachedFile.flush()")
-        fd = self._fs_file
-        m = fd.mode
-        if 'w' in m or 'a' in m:
-            fd.flush()
+        pass  # we don't buffer anything that's written to our file
 
     def fgetattr(self):
         #debug("---> in fs_CachedFile.fgetattr()")
-        return os.stat(self._fs_file)
+        return os.fstat(self._fs_fd)
 
     def ftruncate(self, length):
         #debug("---> in fs_CachedFile.ftruncate(%s)" % str(length))
-        self._fs_file.truncate(length)
+        os.ftruncate(self._fs_fd, length)
 
     def release(self, flags = None):
         #debug("---> in fs_CachedFile.release(%s)" % str(flags))
-        self._fs_file.close()
-        newSize = os.path.getsize(self._fs_path)
+        fd = self._fs_fd
+
+        # Note: we get our file's new size from its (still open) file
+        # descriptor rather than looking it up again by its pathname.
+        newSize = os.fstat(fd).st_size
+        os.close(fd)
         #debug("    new size = %i" % newSize)
         self._fs_sizeChange = newSize - self._fs_startSize
         #debug("    size change = %i" % self._fs_sizeChange)
         self._fs_startSize = newSize  # in case we're opened again
         #debug("    reset our starting size to %i" % self._fs_startSize)
 
+# Use the compiled version of the above class instead iff it's available.
+try:
+    from audiofs._cachefsspeedups import fs_CachedFile
+except ImportError:
+    pass  # just use the pure Python version
+
 
 class fs_CachingFilesystem(fs_AbstractFilesystem):
     """
@@ -176,8 +324,11 @@ class fs_CachingFilesystem(fs_AbstractFilesystem):
 
     def __init__(self, *args, **kw):
         fs_AbstractFilesystem.__init__(self, *args, **kw)
-        self._fs_fileSet = set()
+        self._fs_cachedFiles = collections.OrderedDict()
+            # see _fs_touchCachedFile()
         self._fs_totalSizeInBytes = 0
+        self._fs_actualFiles = {}
+            # see _fs_actualFile()
 
     def fs_processOptions(self, opts):
         #debug("---> in cachefs' fs_processOptions(%s)" % repr(opts))
@@ -185,6 +336,9 @@ class fs_CachingFilesystem(fs_AbstractFilesystem):
 
         val = fs_parseRequiredSuboption(opts, _fs_cacheDirOption)
         self._fs_actualFilesDir = ut.ut_expandedAbsolutePathname(val)
+        self._fs_actualFilesDirPrefix = os.path.join(self._fs_actualFilesDir,
+                                                     "")
+            # it ends with exactly one pathname separator
         #debug("    actual files dir = [%s]" % self._fs_actualFilesDir)
 
         val = fs_parseOptionalSuboption(opts, _fs_capacityOption)
@@ -225,25 +379,38 @@ class fs_CachingFilesystem(fs_AbstractFilesystem):
         """
         #debug("---> in _fs_reconstructFromCacheContents()")
         totalSize = 0
-        fileSet = set()
+        accessedFiles = []
         #debug("    total size = %i" % totalSize)
         top = self._fs_actualFilesDir
         assert top is not None
-        for dir, dirnames, filenames in os.walk(top):
-            for fname in filenames:
-                # Note: we do NOT want to mark these files as having just
-                # been accessed.
-                f = os.path.join(dir, fname)
-                fileSet.add(f)
-                totalSize += os.path.getsize(f)
-                #debug("    + file '%s': new total size = %i" % (f, totalSize))
+        # Note: we do NOT want to mark these files as having just been
+        # accessed.
+        if ur.ur_isOperationSupported('IORING_OP_STATX'):
+            # Get all of the files' statuses at once using io_uring.
+            paths = [e.path for e in _fs_nonDirectoryEntries(top)]
+            for (f, (sz, atime)) in zip(paths,
+                                        ur.ur_sizesAndAccessTimes(paths)):
+                accessedFiles.append((atime, f, sz))
+                totalSize += sz
+        else:
+            for e in _fs_nonDirectoryEntries(top):
+                st = e.stat()
+                accessedFiles.append((st.st_atime, e.path, st.st_size))
+                totalSize += st.st_size
+                #debug("    + file '%s': new total size = %i" % (e.path, totalSize))
+
+        # Note: this is the only time that we need the files' last accessed
+        # times: after this the order in which they were accessed is just
+        # maintained by the order of our cached files.
+        accessedFiles.sort()
         self._fs_totalSizeInBytes = totalSize
-        self._fs_fileSet = fileSet
-        #debug("    unadjusted: total size = %i, file count = %i" % (self._fs_totalSizeInBytes, len(self._fs_fileSet)))
+        self._fs_cachedFiles = collections.OrderedDict(
+                                    [(f, sz) for (t, f, sz) in accessedFiles])
+        #debug("    unadjusted: total size = %i, file count = %i" % (self._fs_totalSizeInBytes, self._fs_fileCount()))
         self._fs_adjustCache()
-        #debug("    adjusted: total size = %i, file count = %i" % (self._fs_totalSizeInBytes, len(self._fs_fileSet)))
-        #debug("    file set = [%s]" % ", ".join(self._fs_fileSet))
-        assert self._fs_fileSet is not None
+        #debug("    adjusted: total size = %i, file count = %i" % (self._fs_totalSizeInBytes, self._fs_fileCount()))
+        #debug("    cached files = [%s]" % ", ".join(self._fs_cachedFiles))
+        assert self._fs_cachedFiles is not None
         assert self._fs_totalSizeInBytes >= 0
         assert self._fs_isCacheProperlyAdjusted()
 
@@ -254,11 +421,28 @@ class fs_CachingFilesystem(fs_AbstractFilesystem):
         this filesystem with pathname 'path'.
 
         This method assumes that 'path' is relative to our mount point
-        (though it starts with a pathname separator).
+        (though it starts with a pathname separator), and that it's already
+        in normal form (which the pathnames that FUSE passes us are).
+
+        Note: since almost every operation calls this method, and the same
+        pathnames are usually passed to it over and over, its results are
+        cached. The actual file that backs a file only depends on the
+        file's pathname, so the cached results never become stale: the
+        cache is just emptied whenever it gets too big.
         """
         #debug("---> in _fs_actualFile(%s)" % path)
         assert path is not None
-        result = os.path.normpath(self._fs_actualFilesDir + os.sep + path)
+        cache = self._fs_actualFiles
+        result = cache.get(path)
+        if result is None:
+            rel = path.lstrip(os.sep)
+            if rel:
+                result = self._fs_actualFilesDirPrefix + rel
+            else:
+                result = self._fs_actualFilesDir
+            if len(cache) >= _fs_maxCachedActualFiles:
+                cache.clear()
+            cache[path] = result
         #debug("    result = [%s]" % result)
         assert result is not None
         assert os.path.isabs(result)  # since _fs_actualFilesDir is
@@ -274,9 +458,36 @@ class fs_CachingFilesystem(fs_AbstractFilesystem):
         """
         #debug("---> in _fs_markActualFileAccessed(%s)" % path)
         assert path is not None
-        if os.path.lexists(path):
-            #debug("    the file exists: updating its access time")
-            _fs_updateFileAccessTime(path)
+        files = self._fs_cachedFiles
+        if path in files:
+            files.move_to_end(path)
+
+        # Note: the files' last accessed times are only used to determine
+        # the order in which they were accessed when we're next mounted.
+        #
+        # Note: this does nothing iff the file doesn't exist, so we don't
+        # need to check that it does first.
+        _fs_updateFileAccessTime(path)
+
+    def _fs_touchCachedFile(self, path, size):
+        """
+        Makes the actual cache file with pathname 'path' - whose size is
+        'size' bytes - the most recently accessed of our cached files,
+        adding it to them iff it isn't already one of them.
+
+        Note: our cached files are the keys of an OrderedDict (which is a
+        hash table combined with a doubly-linked list) whose keys are in the
+        order in which they were last accessed, from least to most
+        recently, so that this and removing the least recently accessed
+        file can be done without having to sort the files. Each file's
+        value is its size in bytes (as it's included in our total size), so
+        that we never have to get it from the file itself.
+        """
+        assert path is not None
+        assert size >= 0
+        files = self._fs_cachedFiles
+        files[path] = size
+        files.move_to_end(path)  # in case it was already one of them
 
 
     def _fs_isCacheProperlyAdjusted(self):
@@ -297,72 +508,66 @@ class fs_CachingFilesystem(fs_AbstractFilesystem):
         above our maximum allowed capacity.
         """
         #debug("---> in _fs_adjustCache()")
-        #self._fs_checkCacheMetadata()
+        #assert self._fs_checkCacheMetadata()
         numExcess = self._fs_excessNumberOfFiles()
         isOverCap = self._fs_areExceedingCapacity()
         #debug("    num. excess files = %i; is over capacity? %s" % (numExcess, str(isOverCap)))
         if numExcess > 0 or isOverCap:
-            try:
-                orderedFiles = list(self._fs_fileSet)
-                orderedFiles.sort(_fs_compareFilesByAccessTime)
-                if numExcess > 0:
-                    for i in xrange(numExcess):
-                        self._fs_deleteFirstFile(orderedFiles)
-                    assert self._fs_excessNumberOfFiles() == 0
-                    if isOverCap:
-                        # It may have changed after deleting the excess files.
-                        isOverCap = self._fs_areExceedingCapacity()
-                while isOverCap:
-                    # Delete files until we're no longer over capacity.
-                    self._fs_deleteFirstFile(orderedFiles)
+            if numExcess > 0:
+                for i in range(numExcess):
+                    self._fs_deleteLeastRecentlyAccessedFile()
+                assert self._fs_excessNumberOfFiles() == 0
+                if isOverCap:
+                    # It may have changed after deleting the excess files.
                     isOverCap = self._fs_areExceedingCapacity()
-            finally:
-                self._fs_fileSet = set(orderedFiles)
+            while isOverCap:
+                # Delete files until we're no longer over capacity.
+                self._fs_deleteLeastRecentlyAccessedFile()
+                isOverCap = self._fs_areExceedingCapacity()
         assert self._fs_isCacheProperlyAdjusted()
-        #self._fs_checkCacheMetadata()
+        #assert self._fs_checkCacheMetadata()
 
-    def _fs_deleteFirstFile(self, lst):
+    def _fs_deleteLeastRecentlyAccessedFile(self):
         """
-        Deletes the first file in 'lst', both from our cache and from 'lst'.
-
-        Note: 'path' is the actual pathname of a file in our cache: it isn't
-        relative to our mount point.
+        Deletes the least recently accessed of our cached files from our
+        cache.
         """
-        #debug("---> in _fs_deleteOneCachedFile()")
-        assert lst is not None
-        assert len(lst) > 0
-        f = lst[0]
+        #debug("---> in _fs_deleteLeastRecentlyAccessedFile()")
+        assert self._fs_fileCount() > 0
+        (f, sz) = self._fs_cachedFiles.popitem(last = False)
         assert os.path.lexists(f)
             # since otherwise unlink() would have already removed it from
-            # our file list
-        sz = os.path.getsize(f)
+            # our cached files
         #debug("    file [%s] is %i bytes long" % (f, sz))
         os.remove(f)
         #debug("    deleted the file")
         self._fs_totalSizeInBytes -= sz
         #debug("    decreased our total size to %i" % self._fs_totalSizeInBytes)
-        del lst[0]
-        #debug("    removed the file from our file list")
         assert self._fs_totalSizeInBytes >= 0
         #assert "self._fs_totalSizeInBytes <= old self._fs_totalSizeInBytes"
 
     def _fs_checkCacheMetadata(self):
         """
         Checks that our metadata about our cache is in sync with the actual
-        contents of the cache.
+        contents of the cache, returning True iff it is.
+
+        Note: this has to stat() every file in our cache, so it's only meant
+        to be used in assertions (as in
+        'assert self._fs_checkCacheMetadata()'), and it always returns True
+        without checking anything if assertions are disabled.
         """
+        if not __debug__:
+            return True
         isValid = True
         #debug("---> in _fs_checkCacheMetadata()")
         top = self._fs_actualFilesDir
         #debug("    top = '%s'" % top)
         sz = 0
         count = 0
-        for dir, dirnames, filenames in os.walk(top):
-            for fname in filenames:
-                f = os.path.join(dir, fname)
-                #debug("    adding '%s'" % f)
-                sz += os.path.getsize(f)
-                count += 1
+        for e in _fs_nonDirectoryEntries(top):
+            #debug("    adding '%s'" % e.path)
+            sz += e.stat().st_size
+            count += 1
         #debug("    our size = %i, calculated size = %i" % (self._fs_totalSizeInBytes, sz))
         ourSize = self._fs_totalSizeInBytes
         if ourSize != sz:
@@ -370,22 +575,23 @@ class fs_CachingFilesystem(fs_AbstractFilesystem):
             report("our total:    %i bytes" % ourSize)
             report("actual total: %i bytes" % sz)
             isValid = False
-        ourCount = len(self._fs_fileSet)
+        ourCount = self._fs_fileCount()
         if ourCount != count:
             report("*** NUMBER OF FILES IN CACHE INCORRECT ***")
             report("our count:    %i files" % ourCount)
             report("actual count: %i files" % count)
-            report("file set = [%s]" % ", ".join(self._fs_fileSet))
+            report("cached files = [%s]" % ", ".join(self._fs_cachedFiles))
             isValid = False
         if not isValid:
-            die("*** CACHE METADATA INCONSISTENT ***")
+            report("*** CACHE METADATA INCONSISTENT ***")
+        return isValid
 
     def _fs_fileCount(self):
         """
         Returns the number of (non-directory) files that are currently in our
         cache.
         """
-        result = len(self._fs_fileSet)
+        result = len(self._fs_cachedFiles)
         assert result >= 0
         return result
 
@@ -417,9 +623,32 @@ class fs_CachingFilesystem(fs_AbstractFilesystem):
             result = (self._fs_totalSizeInBytes > cap)
         return result
 
+    def _fs_unsupportedFuseMethod(self):
+        """
+        The getter of the properties that hide the FUSE methods that we
+        inherit but don't support: it makes it look like we don't have
+        them.
+
+        Note: fuse-python only registers the FUSE methods that a filesystem
+        has, and libfuse fails calls to the unregistered ones with ENOSYS
+        itself, without calling us. (The kernel also stops sending fsync()
+        requests once one has failed with ENOSYS.)
+        """
+        raise AttributeError("unsupported FUSE method")
+
 
     # FUSE methods.
 
+    # We don't support symlinks since we don't want symlinks into our files
+    # (since they can disappear at any time), and we don't support hard
+    # links since we don't want hard links between files in our cache (so
+    # that when we delete a file from our cache we can assume that the
+    # collective size of all of the files in the cache has decreased by the
+    # size of the removed file).
+    symlink =   property(_fs_unsupportedFuseMethod)
+    link =      property(_fs_unsupportedFuseMethod)
+    fsync =     property(_fs_unsupportedFuseMethod)
+
     def _fs_fsinit(self):
         #debug("---> in cachefs._fs_fsinit()")
         fs_AbstractFilesystem.fsinit(self)
@@ -437,20 +666,6 @@ class fs_CachingFilesystem(fs_AbstractFilesystem):
         #debug("---> in cachefs._fs_mkdir(%s, %s)" % (path, str(mode)))
         os.mkdir(self._fs_actualFile(path), mode)
 
-    def _fs_symlink(self, path, path1):
-        #debug("---> in cachefs._fs_symlink(%s, %s)" % (path, path1))
-        # This isn't implemented because we don't want symlinks into our
-        # files (since they can disappear at any time).
-        return fs_handleFunctionNotImplemented()
-
-    def _fs_link(self, path, path1):
-        #debug("---> in cachefs._fs_link(%s, %s)" % (path, path1))
-        # This isn't implemented because we don't want hard links between
-        # files in our cache (so that when we delete a file from our cache
-        # we can assume that the collective size of all of the files in the
-        # cache has decreased by the size of the removed file).
-        return fs_handleFunctionNotImplemented()
-
 
     def _fs_access(self, path, mode):
         #debug("---> in cachefs._fs_access(%s, %s)" % (path, str(mode)))
@@ -483,7 +698,8 @@ class fs_CachingFilesystem(fs_AbstractFilesystem):
         f = self._fs_actualFile(path)
         self._fs_markActualFileAccessed(f)
         incr = fd.fs_sizeIncreaseInBytes()
-        self._fs_fileSet.add(f)  # may already be in there
+        sz = self._fs_cachedFiles.get(f, 0) + incr
+        self._fs_touchCachedFile(f, sz)  # it may already be one of them
         self._fs_totalSizeInBytes += incr
         if incr > 0:
             # No need to adjust the cache if our total size stayed the same
@@ -493,40 +709,53 @@ class fs_CachingFilesystem(fs_AbstractFilesystem):
     def _fs_readdir(self, path, offset):
         #debug("---> in cachefs._fs_readdir(%s, %s)" % (path, str(offset)))
         d = self._fs_actualFile(path)
-        for f in os.listdir(d):
-            yield Direntry(f)
+        # Note: we include each file's type so that callers that only need
+        # to know that don't have to getattr() each file too.
+        with os.scandir(d) as entries:
+            for e in entries:
+                yield Direntry(e.name, type = _fs_direntryType(e))
 
 
     def _fs_truncate(self, path, length):
         #debug("---> in cachefs._fs_truncate(%s, %s)" % (path, str(length)))
         f = self._fs_actualFile(path)
-        sz = os.path.getsize(f)
-        if length < sz:
-            diff = sz - length
-            fd = open(f, "a")
-            fd.truncate(length)
-            fd.release()
-            self._fs_totalSizeInBytes -= diff
+        os.truncate(f, length)
+        sz = self._fs_cachedFiles.get(f)
+        if sz is not None:
+            # Note: only our cached files' sizes are included in our total
+            # size.
+            self._fs_touchCachedFile(f, length)
+            self._fs_totalSizeInBytes += length - sz
         self._fs_markActualFileAccessed(f)
         assert self._fs_totalSizeInBytes >= 0
+        if sz is not None and length > sz:
+            self._fs_adjustCache()
 
     def _fs_rename(self, path, path1):
-# TODO: we're assuming that both 'path' and 'path1' are in our filesystem -
-# is that true ???!!!!???
-# - if it wasn't you'd think it would do a copy and delete instead ...
         #debug("---> in cachefs._fs_rename(%s, %s)" % (path, path1))
         f = self._fs_actualFile(path)
         f1 = self._fs_actualFile(path1)
-        os.rename(f, f1)
-
-        # Our total cache size doesn't change, but we have to remove 'path'
-        # from our set of files and add 'path1' to it.
+        try:
+            os.rename(f, f1)
+        except OSError as ex:
+            # Our cache directory may contain mount points, and a file can't
+            # be renamed to a different filesystem: we can move one there
+            # ourselves, but not a whole directory.
+            if ex.errno != errno.EXDEV or os.path.isdir(f):
+                raise
+            _fs_moveFileAcrossFilesystems(f, f1)
+
+        # We have to replace 'path' with 'path1' in our cached files, and
+        # our total size only changes if 'path1' replaced a cached file.
         if not os.path.isdir(f1):
-            # Only non-directory files are in the file set.
-            s = self._fs_fileSet
-            s.remove(f)
-            s.add(f1)
+            # Only non-directory files are cached files.
+            files = self._fs_cachedFiles
+            sz = files.pop(f, 0)
+            replacedSize = files.pop(f1, 0)  # which is 0 if f1 == f
+            self._fs_touchCachedFile(f1, sz)
+            self._fs_totalSizeInBytes -= replacedSize
             self._fs_markActualFileAccessed(f1)
+            assert self._fs_totalSizeInBytes >= 0
 
     def _fs_chmod(self, path, mode):
         #debug("---> in cachefs._fs_chmod(%s, %s)" % (path, str(mode)))
@@ -538,10 +767,6 @@ class fs_CachingFilesystem(fs_AbstractFilesystem):
         # We don't consider this a file access.
         os.chown(self._fs_actualFile(path), user, group)
 
-    def _fs_fsync(self, isfsyncfile):
-        #debug("---> in cachefs._fs_fsync(%s)" % str(isfsyncfile))
-        return fs_handleFunctionNotImplemented()
-
     def _fs_getattr(self, path):
         # We don't consider this a file access.
         return os.lstat(self._fs_actualFile(path))
@@ -563,12 +788,12 @@ class fs_CachingFilesystem(fs_AbstractFilesystem):
     def _fs_unlink(self, path):
         #debug("---> in cachefs._fs_unlink(%s)" % path)
         f = self._fs_actualFile(path)
-        sz = os.path.getsize(f)
         #debug("    deleting the file itself")
         os.remove(f)
-        #debug("    removing the file from our file list")
-        #debug("    file set = [%s]" % ", ".join(self._fs_fileSet))
-        self._fs_fileSet.remove(f)
+        #debug("    removing the file from our cached files")
+        #debug("    cached files = [%s]" % ", ".join(self._fs_cachedFiles))
+        sz = self._fs_cachedFiles.pop(f, 0)
+            # it's not one of them iff it's never been released
         #debug("    decreasing our total size by %i bytes" % sz)
         self._fs_totalSizeInBytes -= sz
         #debug("    our total size now = %i bytes" % self._fs_totalSizeInBytes)
@@ -0,0 +1,118 @@
+# Contains the modules that implement each of our programs, along with the
+# function that's used to run all of them.
+#
+# Each program's code is in the module in this package whose name is the
+# program's name with every '-' replaced by '_', and is run by calling that
+# module's main() function.
+#
+# Copyright (C) James MacKay 2008
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+
+import importlib
+import os.path
+import pkgutil
+import shutil
+import sys
+
+
+# Constants.
+
+# The name of the program that runs the program whose name is its first
+# argument.
+_multicallProgramName = "audiofs"
+
+# The usage message for our multicall program.
+_multicallUsageMessageFmt = """
+usage: %s program [arg ...]
+
+which runs the AudioFS program 'program' with the arguments
+'arg ...', where 'program' is one of:
+
+    %s
+"""
+
+
+# Functions.
+
+def dispatch():
+    """
+    Runs the program whose name is the basename of the name that the current
+    process was invoked as, or the program whose name is our first argument
+    if the current process was invoked as our multicall program.
+
+    Note: this is the function that is called to run all of our programs, so
+    that they can all be run from one executable (for example by making each
+    program a symlink to our multicall program).
+    """
+    name = os.path.basename(sys.argv[0])
+    if name == _multicallProgramName:
+        if len(sys.argv) < 2:
+            _exitWithUsageMessage()
+        multicallPath = sys.argv.pop(0)
+        name = sys.argv[0]
+        sys.argv[0] = _programPathname(name, multicallPath)
+            # so that the program sees itself as having been invoked
+            # directly (some programs use the pathname they were invoked
+            # with, for example to symlink to themselves)
+    modName = "%s.%s" % (__name__, name.replace("-", "_"))
+    if name.startswith("_") or name == _multicallProgramName:
+        _exitWithUsageMessage("Unknown program: %s" % name)
+    try:
+        mod = importlib.import_module(modName)
+    except ModuleNotFoundError as ex:
+        if ex.name != modName:
+            raise  # one of the program's modules is missing
+        _exitWithUsageMessage("Unknown program: %s" % name)
+    mod.main()
+
+def _programPathname(name, multicallPath):
+    """
+    Returns the pathname of the installed program named 'name', given the
+    pathname 'multicallPath' that our multicall program was invoked with.
+
+    The program is assumed to be installed in the same directory as our
+    multicall program, unless it isn't there but can be found on the PATH.
+    """
+    assert name
+    assert multicallPath
+    result = os.path.join(os.path.dirname(multicallPath), name)
+    if not os.path.isfile(result):
+        result = shutil.which(name) or result
+    assert result
+    return result
+
+def _allProgramNames():
+    """
+    Returns a sorted list of the names of all of our programs.
+    """
+    result = [m.name.replace("_", "-") for m in pkgutil.iter_modules(__path__)
+                if not m.name.startswith("_")]
+    result.sort()
+    assert result is not None
+    return result
+
+def _exitWithUsageMessage(msg = None):
+    """
+    Writes our multicall program's usage message - preceded by 'msg' iff
+    it isn't None - to standard error and then exits with a non-zero exit
+    code.
+    """
+    # 'msg' may be None
+    if msg is not None:
+        print("\n%s." % msg, file = sys.stderr)
+    print(_multicallUsageMessageFmt % (_multicallProgramName,
+            "\n    ".join(_allProgramNames())), file = sys.stderr)
+    sys.exit(1)
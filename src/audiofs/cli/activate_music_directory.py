@@ -1,5 +1,3 @@
-#!/usr/bin/env python
-#
 # Activates an existing music directory: builds/mounts the caches, mounts
 # the audio filesystems and starts the associated daemons.
 #
@@ -51,4 +49,5 @@ mounted, and all associated daemon processes are started.""" % _conf.rootDir
 
 # Main program.
 
-Program().run()
+def main():
+    Program().run()
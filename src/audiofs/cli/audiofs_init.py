@@ -0,0 +1,155 @@
+# The main program for the 'audiofs-init' command.
+#
+# Copyright (C) James MacKay 2008
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+
+import importlib.resources
+import os
+import os.path
+
+import audiofs.utilities as ut
+
+
+# Constants.
+
+# The name of the subpackage of our package that contains the files that we
+# install.
+_resourcesPackage = "audiofs._resources"
+
+# The basenames of the example configuration files that we install.
+_exampleFilenames = ["configuration.py.example", "lirc-client.map.example"]
+
+# The basenames of the documentation files that we install.
+_documentationFilenames = ["index.html"]
+
+# The directory that we install the example configuration files in by
+# default.
+_defaultConfigDir = os.path.join("/etc", "audiofs")
+
+# Arguments map keys.
+_configDirKey = "configDir"
+_docDirKey = "docDir"
+
+
+# Classes.
+
+class Program(ut.ut_AbstractProgram):
+    """
+    Represents programs that install the example configuration files and the
+    documentation that are included in the AudioFS package.
+    """
+
+    def _usageMessage(self, progName, shortHelpOpts, longHelpOpts,
+                      helpOptionsDesc):
+        result = """
+usage: %s %s %s [-d doc-dir] [config-dir]
+
+which copies the example AudioFS configuration files into the
+directory 'config-dir', or into '%s' if 'config-dir'
+isn't specified. Existing files aren't replaced.
+
+If the '-d' option is specified then the AudioFS documentation
+is also copied into the directory 'doc-dir'.
+
+Note: the directories are created if they don't already exist.
+%s""" % (progName, shortHelpOpts, longHelpOpts, _defaultConfigDir,
+         helpOptionsDesc)
+        assert result
+        return result
+
+    def _shortOptions(self):
+        result = "d:"
+        assert result is not None
+        return result
+
+    def _buildInitialArgumentsMap(self):
+        result = { _configDirKey: _defaultConfigDir, _docDirKey: None }
+        assert result is not None
+        return result
+
+    def _processOption(self, opt, val, argsMap):
+        assert opt
+        # 'val' may be None
+        assert argsMap is not None
+        result = True
+        if opt == "-d":
+            argsMap[_docDirKey] = val
+        else:
+            result = self._handleUnknownOption(opt)
+        return result
+
+    def _processNonOptionArguments(self, args, argsMap):
+        assert args is not None
+        assert argsMap is not None
+        result = True
+        numArgs = len(args)
+        if numArgs > 1:
+            self._fail("Too many arguments")
+            result = False
+        elif numArgs == 1:
+            argsMap[_configDirKey] = args[0]
+        return result
+
+    def _execute(self, argsMap):
+        assert argsMap is not None
+        result = 0
+        if not self._installFiles(_exampleFilenames,
+                                  argsMap[_configDirKey]):
+            result = 1
+        docDir = argsMap[_docDirKey]
+        if docDir is not None and \
+                not self._installFiles(_documentationFilenames, docDir):
+            result = 1
+        assert result >= 0
+        return result
+
+    def _installFiles(self, basenames, d):
+        """
+        Copies the files in our package's resources subpackage whose
+        basenames are in the list 'basenames' into the directory with
+        pathname 'd', creating it first if it doesn't already exist.
+
+        Returns True iff all of the files that didn't already exist in 'd'
+        were successfully copied there.
+        """
+        assert basenames is not None
+        assert d
+        result = True
+        resources = importlib.resources.files(_resourcesPackage)
+        try:
+            os.makedirs(d, exist_ok = True)
+            for name in basenames:
+                f = os.path.join(d, name)
+                if os.path.lexists(f):
+                    self._warn("Not replacing the existing file '%s'" % f)
+                else:
+                    data = resources.joinpath(name).read_bytes()
+                    w = open(f, 'wb')
+                    try:
+                        w.write(data)
+                    finally:
+                        ut.ut_tryToCloseAll(w)
+        except (IOError, OSError) as ex:
+            self._fail("Failed to copy files into the directory '%s': %s" %
+                       (d, ex))
+            result = False
+        return result
+
+
+# Main program.
+
+def main():
+    Program().run()
@@ -1,5 +1,3 @@
-#!/usr/bin/env python
-#
 # Builds a music directory from scratch: the directory must exist and be
 # empty.
 #
@@ -110,4 +108,5 @@ provided it exists and is empty.""" % _conf.rootDir
 
 # Main program.
 
-Program().run()
+def main():
+    Program().run()
@@ -1,4 +1,4 @@
-#!/usr/bin/env python
+# The main program for the 'catalogue-music-directory' command.
 #
 # Copyright (C) James MacKay 2008
 #
@@ -75,4 +75,5 @@ files in all of the audio filesystems.
 
 # Main program.
 
-Program().run()
+def main():
+    Program().run()
@@ -1,4 +1,4 @@
-#!/usr/bin/env python
+# The main program for the 'change-music-rating' command.
 #
 # Copyright (C) James MacKay 2009
 #
@@ -148,4 +148,5 @@ option is specified then the files' ratings are set to 'amount'
 
 # Main program.
 
-Program().run()
+def main():
+    Program().run()
@@ -1,5 +1,3 @@
-#!/usr/bin/env python3
-#
 # Outputs to standard out the HTML that makes up a document that lists,
 # in a very compact (and tiny) way, all of the albums that I have (or at
 # least all of the ones that I have archived as FLAC files.)
@@ -614,4 +612,5 @@ can be '%(htmlFmt)s' (the default)%(pdfHelpPart)s.
 
 # Main program.
 
-Program().run()
+def main():
+    Program().run()
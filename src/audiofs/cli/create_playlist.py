@@ -1,4 +1,4 @@
-#!/usr/bin/env python
+# The main program for the 'create-playlist' command.
 #
 # Copyright (C) James MacKay 2008
 #
@@ -307,4 +307,5 @@ optional '-R' option. It's argument 'how' can be one of:
 
 # Main program.
 
-Program().run()
+def main():
+    Program().run()
@@ -1,5 +1,3 @@
-#!/usr/bin/env python
-#
 # Deactivates an existing music directory: stops the associated daemons,
 # unmounts the audio filesystems and unmounts any cache filesystems.
 #
@@ -49,4 +47,8 @@ unmounted.""" % _conf.rootDir
         assert argsMap is not None
         ad.ad_deactivateMusicDirectory()
 
-Program().run()
+
+# Main program.
+
+def main():
+    Program().run()
@@ -1,5 +1,3 @@
-#!/usr/bin/env python
-#
 # Dismantles an existing music directory: stops the associated daemons,
 # unmounts all of the filesystems mounted under the music directory and
 # deletes everything in and under the music directory.
@@ -50,4 +48,8 @@ in and under the directory is deleted.""" % _conf.rootDir
         assert argsMap is not None
         ad.ad_dismantleMusicDirectory()
 
-Program().run()
+
+# Main program.
+
+def main():
+    Program().run()
@@ -1,4 +1,4 @@
-#!/usr/bin/env python
+# The main program for the 'flac2mp3' command.
 #
 # Copyright (C) James MacKay 2008
 #
@@ -18,12 +18,16 @@
 
 from audiofs import flac2mp3fs
 
-flac2mp3fs.main()
 
-# In order to profile this filesystem comment out the above call to
-# main() and uncomment all of the following lines:
-#import profile
-#import config
-#import os.path
-#profile.Profile.bias = 2.4799752002478521e-05
-#profile.run("flac2mp3fs.main()", os.path.join(config.obtain().metadataDir, "profile-flac2mp3fs.data"))
+# Main program.
+
+def main():
+    flac2mp3fs.main()
+
+    # In order to profile this filesystem comment out the above call to
+    # main() and uncomment all of the following lines:
+    #import profile
+    #from audiofs import config
+    #import os.path
+    #profile.Profile.bias = 2.4799752002478521e-05
+    #profile.run("flac2mp3fs.main()", os.path.join(config.obtain().metadataDir, "profile-flac2mp3fs.data"))
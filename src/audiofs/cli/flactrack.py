@@ -1,4 +1,4 @@
-#!/usr/bin/env python
+# The main program for the 'flactrack' command.
 #
 # Copyright (C) James MacKay 2008
 #
@@ -18,12 +18,16 @@
 
 from audiofs import flactrackfs
 
-flactrackfs.main()
 
-# In order to profile this filesystem comment out the above call to
-# main() and uncomment all of the following lines:
-#import profile
-#import config
-#import os.path
-#profile.Profile.bias = 2.4799752002478521e-05
-#profile.run("flactrackfs.main()", os.path.join(config.obtain().metadataDir, "profile-flactrackfs.data"))
+# Main program.
+
+def main():
+    flactrackfs.main()
+
+    # In order to profile this filesystem comment out the above call to
+    # main() and uncomment all of the following lines:
+    #import profile
+    #from audiofs import config
+    #import os.path
+    #profile.Profile.bias = 2.4799752002478521e-05
+    #profile.run("flactrackfs.main()", os.path.join(config.obtain().metadataDir, "profile-flactrackfs.data"))
@@ -1,4 +1,4 @@
-#!/usr/bin/env python
+# The main program for the 'generate-playlists' command.
 #
 # Copyright (C) James MacKay 2008
 #
@@ -109,4 +109,5 @@ the base music directory ('%(defaultSubdir)s').
 
 # Main program.
 
-Program().run()
+def main():
+    Program().run()
@@ -1,4 +1,4 @@
-#!/usr/bin/env python
+# The main program for the 'list-unrated' command.
 #
 # Copyright (C) James MacKay 2010
 #
@@ -678,14 +678,14 @@ is '%(htmlFmt)s', and the default plain text if 'fmt' is '%(textFmt)s'.
         #print "ratings file pathname = [%s]" % ratingsPath
         f = None
         try:
-            try:
-                f = file(ratingsPath)
-            except BaseException, ex:
-                result = 1
-                self._fail("Couldn't open the ratings file '%s' for "
-                           "reading: %s" % (ratingsPath, str(ex)))
-                assert f is None
-            if f is not None:
+            f = open(ratingsPath)
+        except BaseException as ex:
+            result = 1
+            self._fail("Couldn't open the ratings file '%s' for "
+                       "reading: %s" % (ratingsPath, str(ex)))
+            assert f is None
+        if f is not None:
+            with f:
                 out = sys.stdout
                 formatter = argsMap["outputFormatter"]
                 out.write(formatter.formatStart())
@@ -698,18 +698,17 @@ is '%(htmlFmt)s', and the default plain text if 'fmt' is '%(textFmt)s'.
                         break  # while
                     try:
                         p.processLine(line)
-                    except ProcessingException, ex:
+                    except ProcessingException as ex:
                         result = 1
                         self._fail("Processing a line in the ratings file "
-                            "'%s' failed: %s" % (path, str(ex)))
+                            "'%s' failed: %s" % (ratingsPath, str(ex)))
                 p.finishProcessing()
                 out.write(formatter.formatEnd())
-        finally:
-            ut.ut_tryToCloseAll(f)
         assert result >= 0
         return result
 
 
 # Main program.
 
-Program().run()
+def main():
+    Program().run()
@@ -1,5 +1,3 @@
-#!/usr/bin/env python
-#
 # Maintains a cache directory by checking that the total size of all of the
 # regular files under it does not exceed a specified size, and if it does
 # deletes enough of the least-recently accessed files under it so that the
@@ -176,4 +174,5 @@ become filled with just small files if you use this option.)
 
 # Main program.
 
-Program().run()
+def main():
+    Program().run()
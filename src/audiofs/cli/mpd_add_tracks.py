@@ -1,4 +1,4 @@
-#!/usr/bin/env python
+# The main program for the 'mpd-add-tracks' command.
 #
 # Copyright (C) James MacKay 2008
 #
@@ -59,4 +59,5 @@ the various music filesystems' caches.
 
 # Main program.
 
-Program().run()
+def main():
+    Program().run()
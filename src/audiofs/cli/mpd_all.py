@@ -1,4 +1,4 @@
-#!/usr/bin/env python
+# The main program for the 'mpd-all' command.
 #
 # Copyright (C) James MacKay 2010
 #
@@ -164,26 +164,23 @@ def _writeConfigurationFileContentsTo(f, path, configFile):
     assert f is not None
     assert path is not None
     assert configFile is not None
-    src = None
     try:
-        try:
-            src = file(configFile, "r")
-        except BaseException, ex:
-            raise MpdAllException("the %s configuration file '%s' could "
-                "not be read: %s" % (_programName, configFile, str(ex)))
+        src = open(configFile, "r")
+    except BaseException as ex:
+        raise MpdAllException("the %s configuration file '%s' could "
+            "not be read: %s" % (_programName, configFile, str(ex)))
+    with src:  # but NOT 'f'
         try:
             while True:
                 line = src.readline()
                 if not line:
                     break  # while
                 f.write(line)
-        except BaseException, ex:
+        except BaseException as ex:
             raise MpdAllException("copying the contents of the %s "
                 "configuration file '%s' into the server configuration "
                 "file '%s' failed: %s" %
                 (_programName, configFile, path, str(ex)))
-    finally:
-        ut.ut_tryToCloseAll(src)  # but NOT 'f'
 
 def _writeGeneratedConfigurationParametersTo(f, path, desc, serverDir):
     """
@@ -210,10 +207,10 @@ def _writeGeneratedConfigurationParametersTo(f, path, desc, serverDir):
             os.path.join(serverDir, _serverPidFile)))
         f.write(fmt % ("state_file",
             os.path.join(serverDir, _serverStateFile)))
-    except IOError, ex:
+    except IOError as ex:
         raise MpdAllException("writing a parameter definition to the "
             "server configuration file '%s' failed: %s" % (path, str(ex)))
-    except BaseException, ex:
+    except BaseException as ex:
         raise MpdAllException("generating the value of a parameter "
             "whose definition was to be written to the server configuration "
             "file '%s' failed: %s" % (path, str(ex)))
@@ -232,51 +229,52 @@ def _createServerConfigurationFile(path, desc, mainConfigFile, serverDir):
     assert desc is not None
     assert mainConfigFile is not None
     assert serverDir is not None
-    f = None
     try:
-        try:
-            f = file(path, "w")
-        except BaseException, ex:
-            raise MpdAllException("creating the server configuration file "
-                                  "'%s' failed: %s" % (path, str(ex)))
-        try:
-            f.write(_serverConfigStartFmt % mainConfigFile)
-            _writeConfigurationFileContentsTo(f, path, mainConfigFile)
-            f.write(_serverConfigGeneratedParamsStartFmt % mainConfigFile)
-            _writeGeneratedConfigurationParametersTo(f, path, desc,
-                                                     serverDir)
-        except MpdAllException, ex:
-            raise ex
-        except IOError, ex:
-            raise MpdAllException("writing to the server configuration "
-                                  "file '%s' failed: %s" % (path, str(ex)))
-        except BaseException, ex:
-            raise MpdAllException("generating the contents of the server "
-                                  "configuration file '%s' failed: %s" %
-                                  (path, str(ex)))
-    finally:
-        if not ut.ut_tryToCloseAll(f):
-            raise MpdAllException("closing the server configuration file "
-                "'%s' after writing its contents failed, so it may be "
-                "incomplete" % path)
+        f = open(path, "w")
+    except BaseException as ex:
+        raise MpdAllException("creating the server configuration file "
+                              "'%s' failed: %s" % (path, str(ex)))
+    try:
+        with f:
+            try:
+                f.write(_serverConfigStartFmt % mainConfigFile)
+                _writeConfigurationFileContentsTo(f, path, mainConfigFile)
+                f.write(_serverConfigGeneratedParamsStartFmt %
+                        mainConfigFile)
+                _writeGeneratedConfigurationParametersTo(f, path, desc,
+                                                         serverDir)
+            except MpdAllException as ex:
+                raise ex
+            except IOError as ex:
+                raise MpdAllException("writing to the server configuration "
+                    "file '%s' failed: %s" % (path, str(ex)))
+            except BaseException as ex:
+                raise MpdAllException("generating the contents of the "
+                    "server configuration file '%s' failed: %s" %
+                    (path, str(ex)))
+    except OSError:
+        # Only closing 'f' can raise an OSError here.
+        raise MpdAllException("closing the server configuration file "
+            "'%s' after writing its contents failed, so it may be "
+            "incomplete" % path)
 
 
 def listServer(desc, configFile, dataDir):
     """
     Lists the MPD server described by 'desc'.
     """
-    print _serverName(desc)
+    print(_serverName(desc))
 
 def startServer(desc, configFile, dataDir):
     """
     Starts the MPD server described by 'desc'.
     """
     name = _serverName(desc)
-    print "Starting MPD server %s ..." % name
+    print("Starting MPD server %s ..." % name)
     serverDir = _serverDataDirectory(dataDir, desc)
     try:
         ut.ut_createDirectory(serverDir)
-    except BaseException, ex:
+    except BaseException as ex:
         raise MpdAllException("creating the server data directory '%s' "
                               "failed: %s" % (serverDir, str(ex)))
     ut.ut_tryToMakeFileAllAccess(serverDir)
@@ -284,7 +282,7 @@ def startServer(desc, configFile, dataDir):
     playlistsDir = _serverPlaylistsDirectory(serverDir)
     try:
         ut.ut_createDirectory(playlistsDir)
-    except BaseException, ex:
+    except BaseException as ex:
         raise MpdAllException("creating the server playlist "
                 "subdirectory '%s' failed: %s" % (playlistsDir, str(ex)))
     ut.ut_tryToMakeFileAllAccess(playlistsDir)
@@ -296,14 +294,14 @@ def startServer(desc, configFile, dataDir):
     if ut.ut_executeShellCommand(cmd) is None:
         raise MpdAllException("executing the following command to start it "
                               "failed: %s" % cmd)
-    print "Successfully started the MPD server %s" % name
+    print("Successfully started the MPD server %s" % name)
 
 def stopServer(desc, configFile, dataDir):
     """
     Stops the MPD server described by 'desc'.
     """
     name = _serverName(desc)
-    print "Stopping MPD server %s ..." % name
+    print("Stopping MPD server %s ..." % name)
     serverDir = _serverDataDirectory(dataDir, desc)
     serverConf = _serverConfigurationFile(serverDir)
     if not os.path.exists(serverConf):
@@ -313,7 +311,7 @@ def stopServer(desc, configFile, dataDir):
     if ut.ut_executeShellCommand(cmd) is None:
         raise MpdAllException("executing the following command to stop it "
                               "failed: %s" % cmd)
-    print "Successfully stopped the MPD server %s" % name
+    print("Successfully stopped the MPD server %s" % name)
 
 
 # Classes.
@@ -447,11 +445,11 @@ under it, will be created and deleted if and as necessary.)
                 if _conf.isLocalMpdServer(desc):
                     try:
                         f(desc, configFile, dataDir)
-                    except MpdAllException, ex:
+                    except MpdAllException as ex:
                         result = 2
                         self._fail("%s the MPD server '%s' failed "
                             "because %s" % (action, name, str(ex)))
-                    except BaseException, ex:
+                    except BaseException as ex:
                         result = 3
                         self._fail("%s the MPD server '%s' failed "
                             "due to an unexpected problem: %s" %
@@ -462,4 +460,5 @@ under it, will be created and deleted if and as necessary.)
 
 # Main program.
 
-Program().run()
+def main():
+    Program().run()
@@ -1,4 +1,4 @@
-#!/usr/bin/env python
+# The main program for the 'mpd-create-database' command.
 #
 # Copyright (C) James MacKay 2008
 #
@@ -96,4 +96,5 @@ If 'database' already exists then it will be overwritten.
 
 # Main program.
 
-Program().run()
+def main():
+    Program().run()
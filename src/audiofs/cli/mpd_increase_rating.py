@@ -1,4 +1,4 @@
-#!/usr/bin/env python
+# The main program for the 'mpd-increase-rating' command.
 #
 # Copyright (C) James MacKay 2008
 #
@@ -80,4 +80,5 @@ directory ('%s').""" % (amount, config.maxRating, base, rootDir)
 
 # Main program.
 
-Program().run()
+def main():
+    Program().run()
@@ -1,4 +1,4 @@
-#!/usr/bin/env python
+# The main program for the 'mpd-insert-tracks' command.
 #
 # Copyright (C) James MacKay 2009
 #
@@ -58,4 +58,5 @@ into the various music filesystems' caches.
 
 # Main program.
 
-Program().run()
+def main():
+    Program().run()
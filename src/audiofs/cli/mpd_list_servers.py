@@ -1,4 +1,4 @@
-#!/usr/bin/env python
+# The main program for the 'mpd-list-servers' command.
 #
 # Copyright (C) James MacKay 2010
 #
@@ -190,11 +190,12 @@ has the more compact (and regular) format
             assert desc is not None
             if selector(desc):
                 (host, port) = _conf.mpdServer(desc)
-                print lineFmt % (id, host, port)
+                print(lineFmt % (id, host, port))
         assert result >= 0
         return result
 
 
 # Main program.
 
-Program().run()
+def main():
+    Program().run()
@@ -1,4 +1,4 @@
-#!/usr/bin/env python
+# The main program for the 'mpd-preload-playlists' command.
 #
 # Copyright (C) James MacKay 2009
 #
@@ -361,7 +361,7 @@ of the servers.
         #self._debug("    maxListLen = %i" % maxListLen)
         seenPaths = set()
         allPaths = []
-        listInds = range(len(pathLists))
+        listInds = list(range(len(pathLists)))
         #self._debug("    initially listInds = %s" % self._printableIndexList(listInds))
         for i in range(maxListLen):
             #self._debug("    potentially adding the path at index %i in each list" % i)
@@ -414,7 +414,7 @@ of the servers.
         # First add the index of the current item, followed by those of the
         # 'numAfter' items after it, in order.
         #self._debug("    starting with indices of current and after items")
-        result = range(numPaths)[currIndex:]
+        result = list(range(numPaths))[currIndex:]
         #self._debug("    result = %s" % self._printableIndexList(result))
         if numAfter >= 0:
             result = result[:numAfter + 1]
@@ -424,7 +424,7 @@ of the servers.
         # item, in REVERSE order.
         if numBefore != 0:
             #self._debug("    are paths before the current one to add")
-            indices = range(currIndex)
+            indices = list(range(currIndex))
             #self._debug("    indices = %s" % self._printableIndexList(indices))
             if numBefore > 0:
                 indices = indices[-numBefore:]
@@ -457,4 +457,5 @@ of the servers.
 
 # Main program.
 
-Program().run()
+def main():
+    Program().run()
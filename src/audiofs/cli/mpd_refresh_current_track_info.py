@@ -1,4 +1,4 @@
-#!/usr/bin/env python
+# The main program for the 'mpd-refresh-current-track-info' command.
 #
 # Copyright (C) James MacKay 2008
 #
@@ -69,4 +69,5 @@ is currently being shown).
 
 # Main program.
 
-Program().run()
+def main():
+    Program().run()
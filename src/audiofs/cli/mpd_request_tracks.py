@@ -1,4 +1,4 @@
-#!/usr/bin/env python
+# The main program for the 'mpd-request-tracks' command.
 #
 # Copyright (C) James MacKay 2009
 #
@@ -60,4 +60,5 @@ the various music filesystems' caches.
 
 # Main program.
 
-Program().run()
+def main():
+    Program().run()
@@ -1,4 +1,4 @@
-#!/usr/bin/env python
+# The main program for the 'mpd-select-server' command.
 #
 # Copyright (C) James MacKay 2009
 #
@@ -112,4 +112,5 @@ automatically (as though a radio station had been selected).
 
 # Main program.
 
-Program().run()
+def main():
+    Program().run()
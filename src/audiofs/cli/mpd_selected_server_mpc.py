@@ -1,4 +1,4 @@
-#!/usr/bin/env python
+# The main program for the 'mpd-selected-server-mpc' command.
 #
 # Copyright (C) James MacKay 2009
 #
@@ -20,7 +20,7 @@ from audiofs import mpd, musicfs, config
 
 import audiofs.utilities as ut
 
-from StringIO import StringIO
+from io import StringIO
 import sys
 
 
@@ -101,4 +101,5 @@ command output is discarded.
 
 # Main program.
 
-Program().run()
+def main():
+    Program().run()
@@ -1,4 +1,4 @@
-#!/usr/bin/env python
+# The main program for the 'mpd-set-rating' command.
 #
 # Copyright (C) James MacKay 2008
 #
@@ -89,4 +89,5 @@ is relative to the root music directory
 
 # Main program.
 
-Program().run()
+def main():
+    Program().run()
@@ -1,4 +1,4 @@
-#!/usr/bin/env python
+# The main program for the 'mpd-show-current-track-info' command.
 #
 # Copyright (C) James MacKay 2008
 #
@@ -68,4 +68,5 @@ server's current track to be displayed on the screen.
 
 # Main program.
 
-Program().run()
+def main():
+    Program().run()
@@ -1,4 +1,4 @@
-#!/usr/bin/env python
+# The main program for the 'mpd-speak-current-track-info' command.
 #
 # Copyright (C) James MacKay 2008
 #
@@ -180,4 +180,5 @@ If 'fmt' is omitted then it defaults to the format
 
 # Main program.
 
-Program().run()
+def main():
+    Program().run()
@@ -1,4 +1,4 @@
-#!/usr/bin/env python
+# The main program for the 'mpd-toggle-current-track-info' command.
 #
 # Copyright (C) James MacKay 2008
 #
@@ -69,4 +69,5 @@ or to be hidden if it's currently being shown.
 
 # Main program.
 
-Program().run()
+def main():
+    Program().run()
@@ -1,4 +1,4 @@
-#!/usr/bin/env python
+# The main program for the 'mpd-update-radio-playlist' command.
 #
 # Copyright (C) James MacKay 2009
 #
@@ -20,7 +20,7 @@ from audiofs import mpd, musicfs, config
 
 import audiofs.utilities as ut
 
-from StringIO import StringIO
+from io import StringIO
 
 
 # Constants.
@@ -189,4 +189,5 @@ aren't too few tracks after the current track.
 
 # Main program.
 
-Program().run()
+def main():
+    Program().run()
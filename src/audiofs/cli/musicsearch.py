@@ -1,4 +1,4 @@
-#!/usr/bin/env python
+# The main program for the 'musicsearch' command.
 #
 # Copyright (C) James MacKay 2009
 #
@@ -18,12 +18,16 @@
 
 from audiofs import musicsearchfs
 
-musicsearchfs.main()
 
-# In order to profile this filesystem comment out the above call to
-# main() and uncomment all of the following lines:
-#import profile
-#import config
-#import os.path
-#profile.Profile.bias = 2.4799752002478521e-05
-#profile.run("musicsearchfs.main()", os.path.join(config.obtain().metadataDir, "profile-musicsearchfs.data"))
+# Main program.
+
+def main():
+    musicsearchfs.main()
+
+    # In order to profile this filesystem comment out the above call to
+    # main() and uncomment all of the following lines:
+    #import profile
+    #from audiofs import config
+    #import os.path
+    #profile.Profile.bias = 2.4799752002478521e-05
+    #profile.run("musicsearchfs.main()", os.path.join(config.obtain().metadataDir, "profile-musicsearchfs.data"))
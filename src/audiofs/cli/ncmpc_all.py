@@ -1,4 +1,4 @@
-#!/usr/bin/env python
+# The main program for the 'ncmpc-all' command.
 #
 # Copyright (C) James MacKay 2010
 #
@@ -172,57 +172,58 @@ pathname '%(defaultScreenConfig)s' will be used.
         msg = None
         try:
             try:
-                src = file(srcConfigFile, "r")
+                src = open(srcConfigFile, "r")
             except:
                 msg = "because we\ncouldn't read the '%s' configuration " \
                     "file with pathname\n'%s'\nthat it was to be based on" % \
                     (_defaultScreenProgram, srcConfigFile)
                 raise
 
-            f = None
-            try:
-                tmpDir = _conf.tempDir
+            with src:
+                f = None
                 try:
-                    (f, result) = ut.ut_createTemporaryFile(tmpDir,
+                    tmpDir = _conf.tempDir
+                    try:
+                        (f, result) = ut.ut_createTemporaryFile(tmpDir,
                                         _generatedScreenConfigFilePrefix)
-                except:
-                    msg = "because\nwe couldn't create it for writing in " \
-                        "the temporary directory '%s'" % tmpDir
-                    raise
-
-                # Copy 'srcConfigFile''s contents.
-                try:
-                    while True:
-                        line = src.readline()
-                        if not line:
-                            break
-                        f.write(line)
-                except:
-                    msg = "because\ncopying the contents of the '%s' " \
-                        "configuration file that\nit's based on into it " \
-                        "failed" % _defaultScreenProgram
-                    raise
-
-                # Then write out the 'screen' commands to open a window
-                # for each MPD server.
-                try:
-                    i = 0
-                    for id in _conf.allMpdServerIds():
-                        self._writeConfigurationLineForServer(id, f, i,
-                                                              clientProgram)
-                        i += 1
-                except:
-                    msg = "because\nadding the line to it that would have " \
-                          "opened a window\nfor the MPD server with ID " \
-                          "'%s' failed" % id
-                    raise
-
-            finally:
-                if f is not None:
-                    # If we fail to close the file we're writing to then it
-                    # may be incomplete, so we assume it is, delete it and
-                    # return failure.
-                    f.close()
+                    except:
+                        msg = "because\nwe couldn't create it for writing " \
+                            "in the temporary directory '%s'" % tmpDir
+                        raise
+
+                    # Copy 'srcConfigFile''s contents.
+                    try:
+                        while True:
+                            line = src.readline()
+                            if not line:
+                                break
+                            f.write(line)
+                    except:
+                        msg = "because\ncopying the contents of the " \
+                            "'%s' configuration file that\nit's based on " \
+                            "into it failed" % _defaultScreenProgram
+                        raise
+
+                    # Then write out the 'screen' commands to open a window
+                    # for each MPD server.
+                    try:
+                        i = 0
+                        for id in _conf.allMpdServerIds():
+                            self._writeConfigurationLineForServer(id, f,
+                                                        i, clientProgram)
+                            i += 1
+                    except:
+                        msg = "because\nadding the line to it that " \
+                              "would have opened a window\nfor the MPD " \
+                              "server with ID '%s' failed" % id
+                        raise
+
+                finally:
+                    if f is not None:
+                        # If we fail to close the file we're writing to
+                        # then it may be incomplete, so we assume it is,
+                        # delete it and return failure.
+                        f.close()
         except:
             ut.ut_tryToDeleteAll(result)
             result = None
@@ -254,13 +255,14 @@ pathname '%(defaultScreenConfig)s' will be used.
         (host, port) = _conf.mpdServer(desc)
 
         subcmd = _clientCmdFmt % (clientProgram, host, port)
-        print "subcmd = %s" % subcmd
+        print("subcmd = %s" % subcmd)
         cmd = _screenWindowCmdFmt % (serverId, windowIndex, subcmd)
-        print "cmd = %s" % cmd
+        print("cmd = %s" % cmd)
         f.write(cmd)
         f.write("\n")
 
 
 # Main program.
 
-Program().run()
+def main():
+    Program().run()
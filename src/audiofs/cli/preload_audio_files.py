@@ -1,5 +1,3 @@
-#!/usr/bin/env python
-#
 # Preloads the specified audio files into the relevant filesystem caches
 # so that they don't have to be generated just before they're used.
 #
@@ -88,4 +86,5 @@ at a time.
 
 # Main program.
 
-Program().run()
+def main():
+    Program().run()
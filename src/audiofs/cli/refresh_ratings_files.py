@@ -1,4 +1,4 @@
-#!/usr/bin/env python
+# The main program for the 'refresh-ratings-files' command.
 #
 # Copyright (C) James MacKay 2008
 #
@@ -99,4 +99,5 @@ music file is given an initial rating of %i.)
 
 # Main program.
 
-Program().run()
+def main():
+    Program().run()
@@ -17,8 +17,11 @@
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 #
 
+import functools
 import os
 import os.path
+import pickle
+import threading
 
 import audiofs.utilities as ut
 
@@ -31,12 +34,16 @@ mp3Extension = "mp3"
 oggExtension = "ogg"
 
 # The file extensions for files that contain sets of music file ratings.
+#
+# Note: the constant fullRatingsFileExtension is also defined (see
+# __getattr__()).
 ratingsFileExtension = "ratings"
-fullRatingsFileExtension = ut.ut_fullExtension(ratingsFileExtension)
 
 # The default file extension for playlist files.
+#
+# Note: the constant fullDefaultPlaylistExtension is also defined (see
+# __getattr__()).
 defaultPlaylistExtension = "m3u"
-fullDefaultPlaylistExtension = ut.ut_fullExtension(defaultPlaylistExtension)
 
 # The maximum rating a music file can have.
 #
@@ -51,16 +58,31 @@ _defaultDiscardFile = "/dev/null"
 
 
 # Configuration file pathnames.
+#
+# Note: the pathnames of the user configuration directory and the files in
+# it are obtained using _userConfigPathname().
 _configFilename = "configuration.py"
 _siteConfigDir = os.path.join("/etc", "audiofs")
-_userConfigDir = ut.ut_expandedAbsolutePathname(os.path.join("~", ".audiofs"))
+_userConfigDirPathname = os.path.join("~", ".audiofs")
 _siteConfigFilePathname = os.path.join(_siteConfigDir, _configFilename)
-_userConfigFilePathname = os.path.join(_userConfigDir, _configFilename)
-#_userConfigFilePathname = "~/src/other/music/etc/" + _configFilename
+
+# The basename of the file in the user configuration directory in which the
+# values of the configuration variables that were set by the last
+# execution of the site and user configuration files are cached, so that
+# the files don't have to be executed again until one of them changes.
+_configCacheFilename = ".configuration-cache.pickle"
+
+# The version of the format of our configuration cache file: it needs to be
+# incremented whenever that format - or what's cached in it - changes, so
+# that existing cache files are ignored rather than misinterpreted.
+_configCacheFormatVersion = 2
 
 _mpdSelectedServerFilename = "selected-mpd-server.txt"
-_mpdSelectedServerPathname = os.path.join(_userConfigDir,
-                                          _mpdSelectedServerFilename)
+
+# The maximum number of characters of the first line of the "selected MPD
+# server" configuration file that are read: it's the only line that's
+# used, and a valid one is much shorter than this.
+_mpdSelectedServerMaxLineLength = 256
 
 # The separator between the host and port of an MPD server in the
 # "selected MPD server" configuration file.
@@ -101,7 +123,7 @@ _radioMpdServerMapKeys.extend(_radioMpdServerMapDefaults.keys())
 
 # The names of configuration variables whose values can be set in site or
 # user configuration files.
-_requiredConfigVarNames = ["tempDir", "rootDir", "baseSubdir", "dataDirs",
+_requiredConfigVarNames = frozenset(["tempDir", "rootDir", "baseSubdir", "dataDirs",
     "realFilesSubdir", "allFilesSubdir", "mainFormat", "albumKind",
     "trackKind", "mainKind", "formatPathnameComponentIndex",
     "kindPathnameComponentIndex", "nonAudioFileExtensions",
@@ -124,29 +146,163 @@ _requiredConfigVarNames = ["tempDir", "rootDir", "baseSubdir", "dataDirs",
     "cueprintProgram", "cuebreakpointsProgram",
     "flacProgram", "metaflacProgram", "lameProgram", "id3v2Program",
     "ffmpegProgram", "ffprobeProgram",
-    "oggencProgram", "vorbiscommentProgram"]
-_optionalConfigVarNames = ["logFilePathname", "doDebugLogging",
-    "doMountFilesystems", "mp3Format", "flacFormat", "oggFormat",
+    "oggencProgram", "vorbiscommentProgram"])
+_optionalConfigVarNames = frozenset(["logFilePathname", "doDebugLogging",
+    "doMountFilesystems", "doPrefetchAudioFileStatuses",
+    "mp3Format", "flacFormat", "oggFormat",
     "flac2mp3Filename", "flac2mp3CacheDir", "flac2mp3FlacDir",
     "flac2mp3RealDir",
     "flac2oggFilename", "flac2oggCacheDir", "flac2oggFlacDir",
     "flac2oggRealDir",
     "allNonmusicFilesystemMountPoints", "niceCommandPrefix", "discardFile",
-    "mpdDisplayInformationProgram", "mpdDisplayInformationProgramArguments"]
-
-# The name of the field used in a conf_Configuration instance to determine
-# whether the instance has finished being initialized or not.
-_conf_isInitializedField = '_conf_isInitialized'
+    "mpdDisplayInformationProgram", "mpdDisplayInformationProgramArguments"])
+_allConfigVarNames = _requiredConfigVarNames | _optionalConfigVarNames
+
+# The name of the field used in a conf_Configuration instance to indicate
+# whether the instance's configuration information hasn't been loaded yet,
+# is being loaded or has been loaded (see conf_Configuration.__getattr__()),
+# and the values of that field that indicate each of those states.
+_conf_loadStateField = '_conf_loadState'
+_conf_notLoaded = 0
+_conf_loading = 1
+_conf_loaded = 2
+
+# The lock that's held while a conf_Configuration instance's configuration
+# information is being loaded.
+#
+# Note: it's reentrant since loading the information accesses the
+# instance's attributes, some of which may not have been set yet.
+_conf_loadLock = threading.RLock()
 
 
 # Functions.
 
+def __getattr__(name):
+    """
+    Returns the value of the constant named 'name' that's defined in this
+    module, but whose value is only calculated the first time it's used.
+    """
+    if name == "fullRatingsFileExtension":
+        result = ut.ut_fullExtension(ratingsFileExtension)
+    elif name == "fullDefaultPlaylistExtension":
+        result = ut.ut_fullExtension(defaultPlaylistExtension)
+    else:
+        raise AttributeError("module '%s' has no attribute '%s'" %
+                             (__name__, name))
+    globals()[name] = result  # so we're not called for it again
+    return result
+
+@functools.lru_cache(maxsize = None)
+def _userConfigPathname(basename = None):
+    """
+    Returns the absolute pathname of the user configuration directory if
+    'basename' is None, and otherwise returns the absolute pathname of the
+    file in that directory whose basename is 'basename'.
+
+    Note: these are only calculated when they're first needed (rather than
+    when this module is imported) since expanding '~' can involve looking
+    up the user's home directory in the password database.
+    """
+    # 'basename' may be None
+    result = ut.ut_expandedAbsolutePathname(_userConfigDirPathname)
+    if basename is not None:
+        result = os.path.join(result, basename)
+    assert result is not None
+    assert os.path.isabs(result)
+    return result
+
 def _join(path1, *paths):
     """
     See os.path.join()
     """
     return os.path.join(path1, *paths)
 
+@functools.lru_cache(maxsize = None)
+def _regularFilesInDirectory(d):
+    """
+    Returns a map/dictionary from the basename of each regular file in the
+    directory with pathname 'd' (or of each symlink in it to a regular
+    file) to the file's pathname. The map will be empty if 'd' doesn't
+    exist or can't be read.
+
+    Note: the contents of a directory are only read the first time this is
+    called with its pathname.
+    """
+    assert d is not None
+    result = {}
+    try:
+        with os.scandir(d) as entries:
+            for e in entries:
+                if e.is_file():
+                    result[e.name] = e.path
+    except OSError:
+        pass  # the directory doesn't exist or isn't readable
+    assert result is not None
+    return result
+
+def _configurationFilesKey():
+    """
+    Returns a value that identifies the current versions of the site and
+    user configuration files: it'll be different from the value returned
+    before either of the files was created, modified or deleted.
+
+    See _readCachedConfigurationMap().
+    """
+    result = [_configCacheFormatVersion]
+    for p in [_siteConfigFilePathname, _userConfigPathname(_configFilename)]:
+        try:
+            st = os.stat(p)
+            result.append((p, st.st_mtime_ns, st.st_size))
+        except OSError:
+            result.append((p, None, None))  # the file doesn't exist
+    result = tuple(result)
+    assert result is not None
+    return result
+
+def _readCachedConfigurationMap(key):
+    """
+    Returns the map/dictionary of configuration variables' values that was
+    cached when the configuration files were in the state identified by
+    'key', or returns None if there's no such cached map.
+
+    See _configurationFilesKey(), _writeCachedConfigurationMap().
+    """
+    assert key is not None
+    result = None
+    try:
+        with open(_userConfigPathname(_configCacheFilename), 'rb') as f:
+            (cachedKey, m) = pickle.load(f)
+        if cachedKey == key:
+            result = m
+    except Exception:
+        pass  # there's no (usable) cache file, which is OK
+    # 'result' may be None
+    return result
+
+def _writeCachedConfigurationMap(key, m):
+    """
+    Caches the map/dictionary 'm' of configuration variables' values, which
+    were set when the configuration files were in the state identified by
+    'key'.
+
+    Note: any failure to cache 'm' is ignored: it just means that the
+    configuration files will be executed again next time.
+
+    See _configurationFilesKey(), _readCachedConfigurationMap().
+    """
+    assert key is not None
+    assert m is not None
+    path = _userConfigPathname(_configCacheFilename)
+    tmp = "%s.%i" % (path, os.getpid())
+    try:
+        with open(tmp, 'wb') as f:
+            pickle.dump((key, m), f, pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+    except Exception:
+        # For example the user configuration directory doesn't exist, or a
+        # variable's value can't be pickled.
+        ut.ut_tryToDeleteAll(tmp)
+
 
 # Classes.
 
@@ -155,7 +311,13 @@ class conf_Configuration(object):
     Represents the common configuration for music-related programs and
     modules.
 
-    Note: instances are read-only.
+    Note: instances are read-only once their configuration information has
+    been loaded, at which point they become _conf_FrozenConfiguration
+    instances.
+
+    Note: an instance's configuration information isn't loaded - and so the
+    configuration files aren't executed - until one of its configuration
+    variables is first accessed.
 
     See obtain().
     """
@@ -175,13 +337,16 @@ class conf_Configuration(object):
 
         Returns the absolute pathname of the configuration file if it's found
         and None otherwise.
+
+        Note: each configuration directory's contents are only read once,
+        so a configuration file that's created after the first call to
+        this method won't be found.
         """
         result = None
-        for d in [_userConfigDir, _siteConfigDir]:
+        for d in [_userConfigPathname(), _siteConfigDir]:
             assert os.path.isabs(d)
-            p = os.path.join(d, basename)
-            if os.path.isfile(p):
-                result = p
+            result = _regularFilesInDirectory(d).get(basename)
+            if result is not None:
                 break  # for
         assert result is None or os.path.isabs(result)
         return result
@@ -192,7 +357,7 @@ class conf_Configuration(object):
 
         See findConfigurationFile(), siteConfigurationDirectory().
         """
-        result = _userConfigDir
+        result = _userConfigPathname()
         assert result is not None
         assert os.path.isabs(result)
         return result
@@ -240,10 +405,17 @@ class conf_Configuration(object):
         and - if possible - is set as that of the default server.
         """
         result = None
-        lines = ut.ut_readFileLines(_mpdSelectedServerPathname)
-        if lines:
-            # Ignore lines other than the first.
-            res = lines[0].split(_mpdServerHostPortSeparator)
+        line = None
+        try:
+            path = _userConfigPathname(_mpdSelectedServerFilename)
+            with open(path, 'r') as f:
+                # Ignore lines other than the first.
+                line = f.readline(_mpdSelectedServerMaxLineLength)
+            line = line.rstrip("\r\n")
+        except (IOError, ValueError):
+            pass  # treat it as if no server's been selected
+        if line:
+            res = line.split(_mpdServerHostPortSeparator)
             if len(res) == 2:  # there's both a host and a port
                 if res[0] and ut.ut_isInt(res[1]):
                     port = int(res[1])
@@ -271,9 +443,10 @@ class conf_Configuration(object):
         """
         #print("---> in conf_Configuration.setSelectedMpdServer(%s, %s)" % (host, str(port)))
         line = "%s%s%s" % (host, _mpdServerHostPortSeparator, str(port))
-        #print("    pathname = [%s], line = [%s]" % (_mpdSelectedServerPathname, line))
+        path = _userConfigPathname(_mpdSelectedServerFilename)
+        #print("    pathname = [%s], line = [%s]" % (path, line))
         try:
-            ut.ut_writeFileLines(_mpdSelectedServerPathname, [line])
+            ut.ut_writeFileLines(path, [line])
         except:
             #print("    writing the selected server info failed")
             raise IOError("Failed to set the selected MPD server host and " +
@@ -316,8 +489,7 @@ class conf_Configuration(object):
 
         See allMpdServerDescriptions().
         """
-        result = self.mpdServers.keys()
-        result.sort()
+        result = sorted(self.mpdServers)
         assert result is not None
         return result
 
@@ -332,7 +504,7 @@ class conf_Configuration(object):
         See mpdServerDescription().
         See allMpdServerIds().
         """
-        result = self.mpdServers.values()
+        result = list(self.mpdServers.values())
         assert result is not None
         assert len(result) == len(self.mpdServers)
         return result
@@ -505,35 +677,46 @@ class conf_Configuration(object):
         variables set in the user and site configuration files.
         """
         m = self._buildConfigurationMap()
-        missingRequiredVarNames = []
-        for name in _requiredConfigVarNames:
-            try:
-                #print("---> calling setattr(%s, %s)" % (name, m[name]))
-                setattr(self, name, m[name])
-            except KeyError:
-                missingRequiredVarNames.append(name)
-        for name in _optionalConfigVarNames:
-            try:
-                setattr(self, name, m[name])
-            except KeyError:
-                #print("---> optional config var '%s' not specified" % name)
-                pass
+        missingRequiredVarNames = _requiredConfigVarNames.difference(m)
         if missingRequiredVarNames:
             raise AttributeError("The following required configuration "
                 "variables were not set in the site or user configuration "
-                "files: %s" % ", ".join(missingRequiredVarNames))
+                "files: %s" % ", ".join(sorted(missingRequiredVarNames)))
+
+        # Note: we're still being initialized, so we can set our fields
+        # directly rather than one at a time using setattr().
+        self.__dict__.update([(name, m[name]) for name in
+                              _allConfigVarNames.intersection(m)])
 
     def _buildConfigurationMap(self):
         """
         Builds and returns a map/dictionary containing configuration
         information. The information is obtained from the site and user
         configuration files.
+
+        Note: the values of the configuration variables that the files set
+        are cached, so the files are only executed if one of them has
+        changed since they were last executed. (So a configuration file's
+        values mustn't depend on anything other than the contents of the
+        configuration files.)
         """
         #print("---> in _buildConfigurationMap()")
-        result = self._buildInitialConfigurationMap()
-        #print("_userConfigFilePathname = [%s]" % _userConfigFilePathname)
-        self._updateMapFromConfigurationFile(_siteConfigFilePathname, result)
-        self._updateMapFromConfigurationFile(_userConfigFilePathname, result)
+        key = _configurationFilesKey()
+        result = _readCachedConfigurationMap(key)
+        if result is None:
+            m = self._buildInitialConfigurationMap()
+            userPath = _userConfigPathname(_configFilename)
+            #print("userPath = [%s]" % userPath)
+            self._updateMapFromConfigurationFile(_siteConfigFilePathname, m)
+            self._updateMapFromConfigurationFile(userPath, m)
+
+            # Only our configuration variables' values are cached (and
+            # returned): the files may also have set other variables (and
+            # imported modules) whose values can't be cached.
+            result = {}
+            for name in _allConfigVarNames.intersection(m):
+                result[name] = m[name]
+            _writeCachedConfigurationMap(key, result)
         assert result is not None
         return result
 
@@ -555,6 +738,7 @@ class conf_Configuration(object):
             "flacFormat": flacExtension,
             "oggFormat": oggExtension,
             "doMountFilesystems": True,
+            "doPrefetchAudioFileStatuses": False,
             "doDebugLogging": False,
             "logFilePathname": None,
             "mpdDisplayInformationProgram": None,
@@ -589,15 +773,22 @@ class conf_Configuration(object):
         Defines configuration variables whose values are calculated from
         the ones defined in the configuration files.
         """
-        self.baseDir = _join(self.rootDir, self.baseSubdir)
+        # Note: all of the subdirectories are relative pathnames, so we join
+        # them to their parent directories directly rather than using
+        # os.path.join() (whose extra checks and normalization would be
+        # wasted on them).
+        sep = os.sep
+        _j = sep.join
+        root = self.rootDir.rstrip(sep)
+        self.baseDir = _j((root, self.baseSubdir))
 
         # The subdirectory that contains files in the file format from which
         # ones in other formats are generated, and of the kind that other
         # kinds only represent a part of.
         if self.formatPathnameComponentIndex == 0:
-            sd = _join(self.mainFormat, self.mainKind)
+            sd = _j((self.mainFormat, self.mainKind))
         else:
-            sd = _join(self.mainKind, self.mainFormat)
+            sd = _j((self.mainKind, self.mainFormat))
         self.mainKindAndFormatSubdir = sd
 
         # Build the list of all music filesystem mount points.
@@ -606,22 +797,23 @@ class conf_Configuration(object):
         allPoints.extend(self.flac2oggMountPointToBitrateMap)
         self.allMusicFilesystemMountPoints = allPoints
 
-        self.otherDir = _join(self.rootDir, self.otherSubdir)
-        self.realFilesDir = _join(self.rootDir, self.realFilesSubdir)
-        self.binDir = _join(self.otherDir, self.binSubdir)
-        self.systemDir = _join(self.otherDir, self.systemSubdir)
-        self.documentationDir = _join(self.otherDir,
-                                      self.documentationSubdir)
-        self.metadataDir = _join(self.otherDir, self.metadataSubdir)
-        self.playlistsDir = _join(self.otherDir, self.playlistsSubdir)
-        self.customPlaylistsDir = _join(self.playlistsDir,
-                                        self.customPlaylistsSubdir)
-        self.generatedPlaylistsDir = _join(self.playlistsDir,
-                                           self.generatedPlaylistsSubdir)
-        self.ratingsDir = _join(self.otherDir, self.ratingsSubdir)
-        self.searchDir = _join(self.otherDir, self.searchSubdir)
-        self.cataloguePathname = _join(self.metadataDir,
-                                       self.catalogueFilename)
+        otherDir = _j((root, self.otherSubdir))
+        metadataDir = _j((otherDir, self.metadataSubdir))
+        playlistsDir = _j((otherDir, self.playlistsSubdir))
+        self.otherDir = otherDir
+        self.realFilesDir = _j((root, self.realFilesSubdir))
+        self.binDir = _j((otherDir, self.binSubdir))
+        self.systemDir = _j((otherDir, self.systemSubdir))
+        self.documentationDir = _j((otherDir, self.documentationSubdir))
+        self.metadataDir = metadataDir
+        self.playlistsDir = playlistsDir
+        self.customPlaylistsDir = _j((playlistsDir,
+                                      self.customPlaylistsSubdir))
+        self.generatedPlaylistsDir = _j((playlistsDir,
+                                         self.generatedPlaylistsSubdir))
+        self.ratingsDir = _j((otherDir, self.ratingsSubdir))
+        self.searchDir = _j((otherDir, self.searchSubdir))
+        self.cataloguePathname = _j((metadataDir, self.catalogueFilename))
 
         # Build the list of all (music and non-music) filesystem mount
         # points.
@@ -634,7 +826,6 @@ class conf_Configuration(object):
         self.commonMountOptions = ",".join(self.commonMountOptionsList)
 
         # The indices relative to rootDir, not baseDir.
-        sep = os.sep
         bsdir = self.baseSubdir.strip(sep)
         if bsdir:
             adj = bsdir.count(sep) + 1
@@ -646,23 +837,51 @@ class conf_Configuration(object):
             self.formatPathnameComponentIndex + adj
 
     def __init__(self):
-        initVar = _conf_isInitializedField
-        self.__dict__[initVar] = False
+        self.__dict__[_conf_loadStateField] = _conf_notLoaded
+
+    def __getattr__(self, name):
+        # Note: this is only called when an attribute isn't found normally,
+        # so it doesn't slow down accesses to our configuration variables
+        # once they've been loaded.
+        if name.startswith("__"):
+            raise AttributeError(name)  # it's never a configuration variable
+        d = self.__dict__
+        with _conf_loadLock:
+            if d[_conf_loadStateField] == _conf_notLoaded:
+                self._load()
+            # Otherwise we're either loaded (possibly by another thread) or
+            # this thread's in the middle of loading us.
         try:
-            self.initialize()
-            self.defineCalculatedVariables()
-        finally:
-            self.__dict__[initVar] = True
-        self.checkConfiguration()
-            # we intentionally do this AFTER we can't be modified
+            return d[name]
+        except KeyError:
+            raise AttributeError(name)
 
-    def __setattr__(self, name, value):
-        isInit = getattr(self, _conf_isInitializedField)
-        if isInit:
-            raise AttributeError("can't set configuration information: " +
-                                 "it's read-only")
-        else:
-            self.__dict__[name] = value
+    def _load(self):
+        """
+        Loads this instance's configuration information by setting the
+        values of all of its fields, then checks it.
+
+        Note: if loading the information fails then this instance is left
+        as it was before, so that trying to load it again will fail in the
+        same way (rather than leaving some fields set and others not).
+        """
+        d = self.__dict__
+        orig = dict(d)
+        d[_conf_loadStateField] = _conf_loading
+        try:
+            try:
+                self.initialize()
+                self.defineCalculatedVariables()
+            finally:
+                self.__class__ = _conf_FrozenConfiguration
+            self.checkConfiguration()
+                # we intentionally do this AFTER we can't be modified
+        except:
+            d.clear()
+            d.update(orig)
+            object.__setattr__(self, "__class__", conf_Configuration)
+            raise
+        d[_conf_loadStateField] = _conf_loaded
 
     def __delattr__(self, name):
         raise AttributeError("can't delete configuration information: "
@@ -970,6 +1189,22 @@ class conf_Configuration(object):
             raise ValueError(msg)
 
 
+class _conf_FrozenConfiguration(conf_Configuration):
+    """
+    The class of a conf_Configuration instance once its configuration
+    information has been loaded, which prevents the information from being
+    changed.
+
+    Note: instances change to this class rather than checking whether
+    they've been loaded on every assignment to one of their fields, so that
+    loading their configuration information is as fast as possible.
+    """
+
+    def __setattr__(self, name, value):
+        raise AttributeError("can't set configuration information: " +
+                             "it's read-only")
+
+
 # Constants.
 
 # The default configuration instance.
@@ -22,13 +22,13 @@
 import os
 import os.path
 
-import musicfs
-import music
-import mergedfs
-from fscommon import debug, report, warn
-import fscommon
-import utilities as ut
-import config
+import audiofs.musicfs as musicfs
+import audiofs.music as music
+import audiofs.mergedfs as mergedfs
+from audiofs.fscommon import debug, report, warn
+import audiofs.fscommon as fscommon
+import audiofs.utilities as ut
+import audiofs.config as config
 
 from fuse import Direntry
 
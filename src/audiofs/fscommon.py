@@ -30,15 +30,15 @@ import optparse
 import fuse
 from fuse import Direntry
 
-import utilities as ut
-import config
+import audiofs.utilities as ut
+import audiofs.config as config
 
 
 # Configuration.
 
 if not hasattr(fuse, '__version__'):
-    raise RuntimeError, \
-        "your fuse-py doesn't know of fuse.__version__, probably it's too old."
+    raise RuntimeError("your fuse-py doesn't know of fuse.__version__, "
+                       "probably it's too old.")
 
 fuse.fuse_python_api = (0, 2)
 
@@ -62,14 +62,14 @@ def _fs_buildLogFile():
     else:
         path = os.devnull
         #print "    path set to default value '%s'" % path
-    result = file(path, "a", 0)  # append, unbuffered
+    result = open(path, "a", 1)  # append, line buffered
     assert result is not None
     return result
 
 _fs_logFile = _fs_buildLogFile()
 _fs_debugLogFile = ut.ut_findAttribute(config.obtain(), "doDebugLogging")
 if _fs_debugLogFile is None:
-    _fs_debugLogFile = file(os.devnull, "a")
+    _fs_debugLogFile = open(os.devnull, "a")
 else:
     #print "debug log file = log file = %s" % _fs_logFile
     _fs_debugLogFile = _fs_logFile
@@ -79,7 +79,7 @@ def debug(msg):
     Logs the debugging message 'msg', if we're logging debugging messages.
     """
     #print "---> in debug(%s)" % msg
-    print >> _fs_debugLogFile, msg
+    print(msg, file = _fs_debugLogFile)
     _fs_debugLogFile.flush()
 
 def report(msg):
@@ -87,7 +87,7 @@ def report(msg):
     Logs the message 'msg' as an informational message.
     """
     #print "---> in report(%s)" % msg
-    print >> _fs_logFile, msg
+    print(msg, file = _fs_logFile)
     _fs_logFile.flush()
 
 def warn(msg):
@@ -95,7 +95,7 @@ def warn(msg):
     Logs the message 'msg' as a warning message.
     """
     #print "---> in warn(%s)" % msg
-    print >> _fs_logFile, "WARNING: " + msg
+    print("WARNING: " + msg, file = _fs_logFile)
     _fs_logFile.flush()
 
 
@@ -105,7 +105,7 @@ def die(msg, ex = None):
     to either exit (if 'ex' is None) or raise the exception 'ex'.
     """
     #print "---> in die(%s, %s)" % (msg, str(ex))
-    print >> _fs_logFile, "*** FATAL ERROR: %s" % msg
+    print("*** FATAL ERROR: %s" % msg, file = _fs_logFile)
     try:
         _fs_logFile.close()
     finally:
@@ -188,11 +188,11 @@ def fs_areReadOnlyFlags(flags):
 def fs_flag2mode(flags):
     """
     Converts the flags 'flags' into a mode string for use in open()ing a
-    file in Python.
+    file in Python. The file is always opened in binary mode.
 
     From example/xmp.py in the fuse-python distribution.
     """
-    md = {os.O_RDONLY: 'r', os.O_WRONLY: 'w', os.O_RDWR: 'w+'}
+    md = {os.O_RDONLY: 'rb', os.O_WRONLY: 'wb', os.O_RDWR: 'wb+'}
     result = md[flags & _fs_allModeFlags]
     if flags & os.O_APPEND:
         result = result.replace('w', 'a', 1)
@@ -368,8 +368,8 @@ class fs_AbstractReadOnlyFileStat(object):
         modified for a file in a read-only filesystem.
         """
         #debug("-0-> in _fs_unsettable(%s)" % newValue)
-        raise AttributeError, "can't set file stat information for " + \
-            "files in a read-only filesystem"
+        raise AttributeError("can't set file stat information for " +
+            "files in a read-only filesystem")
 
     def _fs_getMode(self):
         """
@@ -709,7 +709,7 @@ class fs_AbstractReadOnlyFile(object):
         directly.
         """
         #debug("---> in _fs_unsettable(%s)" % newValue)
-        raise AttributeError, "can't set the value of this property directly"
+        raise AttributeError("can't set the value of this property directly")
 
     def _fs_directIO(self):
         """
@@ -797,7 +797,7 @@ class fs_ReadOnlyDelegatingFile(fs_AbstractReadOnlyFile):
 
     def fgetattr(self):
         #debug("---> in fs_ReadOnlyDelegatingFile.fgetattr()")
-        return os.stat(self._fs_file)
+        return os.fstat(self._fs_file.fileno())
 
     def release(self, flags = None):
         self._fs_file.close()
@@ -809,8 +809,9 @@ class fs_ReadOnlyStringFile(fs_AbstractReadOnlyFile):
 
     Note: the getattr() method for a filesystem containing a file represented
     by an instance of this class must be sure to return an object whose
-    'st_size' field is exactly the length of the instance's string: otherwise
-    when the instance's file is read no or truncated data will be obtained.
+    'st_size' field is exactly the length of the instance's string once it's
+    been encoded (using UTF-8): otherwise when the instance's file is read no
+    or truncated data will be obtained.
     """
 
     def __init__(self, path, contents, flags, *mode):
@@ -827,6 +828,8 @@ class fs_ReadOnlyStringFile(fs_AbstractReadOnlyFile):
         fs_AbstractReadOnlyFile.__init__(self)
         assert path is not None
         assert contents is not None
+        if isinstance(contents, str):
+            contents = contents.encode("utf-8")
         self._fs_contents = contents
 
     # FUSE methods.
@@ -904,7 +907,7 @@ class fs_ReadOnlyBeingGeneratedFile(fs_AbstractReadOnlyFile):
                 #debug("    found a file to read from: seeking to offset %i" % offset)
                 f.seek(offset)
                 numTries = _fs_numBeingGeneratedReadTries
-                for i in xrange(numTries):
+                for i in range(numTries):
                     #debug("    try #%i: reading at most %i bytes" % (i + 1, length))
                     result = f.read(length)
                     if result:
@@ -915,7 +918,7 @@ class fs_ReadOnlyBeingGeneratedFile(fs_AbstractReadOnlyFile):
                         time.sleep(_fs_moment)
             else:
                 warn("no audio file to read() from and couldn't regenerate one")
-                result = ""
+                result = b""
         finally:
             #debug("    closing the file we read from (if any)")
             ut.ut_tryToCloseAll(f)
@@ -987,9 +990,9 @@ class fs_ReadOnlyBeingGeneratedFile(fs_AbstractReadOnlyFile):
         assert p is not None
         try:
             #debug("    trying to open '%s' for reading ..." % p)
-            result = file(p, "r")
+            result = open(p, "rb")
             #debug("    successfully opened '%s' for reading" % p)
-        except IOError, ex:
+        except IOError as ex:
             if ex.errno == errno.ENOENT:
                 result = None  # file doesn't exist
             else:
@@ -1239,10 +1242,10 @@ class fs_AbstractFilesystem(fuse.Fuse):
         if self.fuse_args.mount_expected():
             try:
                 self.fs_processOptions(opts)
-            except fs_OptionParsingException, ex:
+            except fs_OptionParsingException as ex:
                 areArgsValid = False
                 fullMsg = "\n%s%s\n" % (ex.fs_message(), usageMsg)
-                print >> sys.stderr, fullMsg
+                print(fullMsg, file = sys.stderr)
         if areArgsValid:
             self.main()
 
@@ -26,10 +26,10 @@ import sys
 
 from fuse import Direntry
 
-import fscommon
-from fscommon import debug, report, warn, fs_defaultFileSize, \
+import audiofs.fscommon as fscommon
+from audiofs.fscommon import debug, report, warn, fs_defaultFileSize, \
     fs_handleNoSuchFile, fs_handleDenyAccess
-import utilities as ut
+import audiofs.utilities as ut
 
 
 # Constants.
@@ -1693,14 +1693,14 @@ class fs_AbstractMetadataMergedFilesystem(fs_AbstractMergedFilesystem):
         """
         Returns a string consisting of the entire contents of the metadata
         file with pathname 'path' that contains metadata describing the file
-        with pathname 'origFile', or None if there is no metadata file with
+        with pathname 'origPath', or None if there is no metadata file with
         pathname 'path'.
 
         This method assumes that both 'path' and 'origPath' are relative to
         our mount point (though they start with a pathname separator).
         """
         assert path is not None
-        assert origFile is not None
+        assert origPath is not None
 
         # 'result' may be None
         raise NotImplementedError
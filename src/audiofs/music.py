@@ -930,6 +930,15 @@ def _mu_flacCueFileBreakpointToSeconds(br):
     assert result >= -1
     return result
 
+# Use the compiled versions of some of the above functions instead iff
+# they're available.
+try:
+    from audiofs._musicspeedups import \
+        _mu_convertSexagesimalDurationToSeconds, \
+        _mu_flacCueFileBreakpointToSeconds
+except ImportError:
+    pass  # just use the pure Python versions
+
 
 class mu_AlbumTrackExtractor(object):
     """
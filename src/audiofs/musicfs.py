@@ -24,19 +24,19 @@ import os.path
 import sys
 
 import xml.sax
-import anydbm
+import dbm
 import shelve
 import random
 import time
 
 from fuse import Direntry
 
-import music
-import mergedfs
-from fscommon import debug, report, warn
-import fscommon
-import config
-import utilities as ut
+import audiofs.music as music
+import audiofs.mergedfs as mergedfs
+from audiofs.fscommon import debug, report, warn
+import audiofs.fscommon as fscommon
+import audiofs.config as config
+import audiofs.utilities as ut
 
 
 # Constants.
@@ -404,10 +404,12 @@ def _fs_openDbmFile(path, flag = 'r'):
     """
     Opens, in the manner specified by the flag 'flag', the DBM file with
     pathname 'path' and returns the mapping object corresponding to it.
+
+    See _fs_DbmFile.
     """
     assert path is not None
     assert flag is not None
-    result = anydbm.open(path, flag)
+    result = _fs_DbmFile(dbm.open(path, flag))
     assert result is not None
     return result
 
@@ -744,14 +746,14 @@ def _fs_catalogueCompareFilePathnames(path1, path2):
     n2 = len(comps2)
     result = 0
     if n1 == n2:
-        for i in xrange(n1):
-            result = cmp(comps1[i], comps2[i])
+        for i in range(n1):
+            result = (comps1[i] > comps2[i]) - (comps1[i] < comps2[i])
             if result != 0:
                 break
     else:
         last1 = n1 - 1
         last2 = n2 - 1
-        for i in xrange(min(n1, n2)):
+        for i in range(min(n1, n2)):
             # All subdirs in a dir precede all files in the dir.
             isDir1 = (i < last1)
             isDir2 = (i < last2)
@@ -762,7 +764,8 @@ def _fs_catalogueCompareFilePathnames(path1, path2):
             else:
                 # The i'th components either both name dirs or both name
                 # files.
-                result = cmp(comps1[i], comps2[i])
+                result = ((comps1[i] > comps2[i]) -
+                          (comps1[i] < comps2[i]))
             if result != 0:
                 break
     assert abs(result) <= 1
@@ -906,7 +909,7 @@ def _fs_appendFileCategoryCatalogueLines(lines, catName, itemMap, indent):
         # written out in a consistent order. We're not especially
         # concerned with what that order is, though.
         #debug("    sorting items by key ...")
-        items = itemMap.items()
+        items = list(itemMap.items())
         ut.ut_sortTuplesByItem(items, 0)
         #debug("    appending lines for each item:")
         quote = ut.ut_quoteForXml
@@ -1057,6 +1060,43 @@ def fs_minimumRatingToChancesConverter(rating, minRating):
 
 # Classes.
 
+class _fs_DbmFile(object):
+    """
+    Wraps a DBM file's mapping object so that the values in it are
+    retrieved as strings rather than the bytes that the dbm module
+    returns them as.
+
+    Only the operations that we use on DBM files are supported.
+    """
+
+    def __init__(self, db):
+        """
+        Initializes us with the dbm module mapping object 'db' that we're
+        to wrap.
+        """
+        assert db is not None
+        self._fs_db = db
+
+    def __contains__(self, key):
+        return key in self._fs_db
+
+    def __getitem__(self, key):
+        return self._fs_db[key].decode()
+
+    def __setitem__(self, key, value):
+        self._fs_db[key] = value
+
+    def get(self, key, default = None):
+        if key in self._fs_db:
+            result = self[key]
+        else:
+            result = default
+        return result
+
+    def close(self):
+        self._fs_db.close()
+
+
 class fs_AbstractSortedMusicDirectoryCatalogueBuilder(object):
     """
     An abstract base class for classes of objects that build a music
@@ -1599,7 +1639,7 @@ class fs_AbstractGenerateCatalogueDaemonProcess(ut.
 #   isn't currently read, but if/when it is used in the future then we'll be in
 #   trouble
             #debug("    opening temp file (for writing) ...")
-            w = file(self._fs_temporaryFile(), 'w', bufSize)
+            w = open(self._fs_temporaryFile(), 'w', bufSize)
 
             #debug("    getting catalogue builder from generator ...")
             b = self._fs_catalogueBuilderFromGenerator(generator)
@@ -2135,7 +2175,7 @@ class fs_MusicDirectoryCatalogueExploder(fs_AbstractMusicDirectoryCatalogueParse
                 # in case it doesn't already exist
             w = None
             try:
-                w = file(path, 'w')
+                w = open(path, 'w')
                 info.writeXmlElement(w)
             finally:
                 if w is not None:
@@ -2433,7 +2473,7 @@ class fs_UpdatedRatingsFileBuilder(fs_OrderedOriginalPathnameListBuilder):
                     self._fs_reportError("Found (and are discarding) an "
                         "invalid line in the ratings file '%s' when trying "
                         "to update it: the line is [%s]" %
-                        (self._fs_currRatingsFile, line))
+                        (self._fs_currRatingsFile, currLine))
                 elif currRating is None:
                     #debug("    curr line is a comment line")
                     self._fs_write(currLine)
@@ -3414,7 +3454,7 @@ class fs_PlaylistCandidatePathnameListBuilder(fs_OrderedPathnameListBuilder):
         rating = int(self._fs_ratingsMap[str(origPath)])
         numChances = self._fs_ratingToChancesCount(rating)
         if numChances > 0:
-            for i in xrange(numChances):
+            for i in range(numChances):
                 self._fs_writeLine(path)
             self._fs_candidateCount += 1
             self._fs_lineCount += numChances
@@ -4360,7 +4400,7 @@ class fs_MusicMetadataManager(object):
             #debug("    db file = [%s], catalogue file = [%s]" % (dbPath, catPath))
             if force or ut.ut_doUpdateFile(dbPath, catPath):
                 #debug("    are (re)building search db file ...")
-                import musicsearchfs
+                import audiofs.musicsearchfs as musicsearchfs
                     # we do this here to avoid requiring search-specific
                     # dependencies when there's no music search directory
                 keys = musicsearchfs.fs_tagsToKeys(_conf.searchableTagNames)
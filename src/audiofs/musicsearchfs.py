@@ -20,13 +20,13 @@
 import os
 import os.path
 
-from filesearchfs import fs_AbstractFileSearchFilesystem
-import filesearchfs
-import musicfs
+from audiofs.filesearchfs import fs_AbstractFileSearchFilesystem
+import audiofs.filesearchfs as filesearchfs
+import audiofs.musicfs as musicfs
 
-from fscommon import debug, report, warn
-import fscommon
-import utilities as ut
+from audiofs.fscommon import debug, report, warn
+import audiofs.fscommon as fscommon
+import audiofs.utilities as ut
 
 
 # Constants.
@@ -98,7 +98,7 @@ class _fs_MusicSearchDatabaseBuilder(musicfs.fs_AbstractMusicDirectoryCatalogueP
         assert dbPathname is not None
         assert searchKeys  # not None or empty
         musicfs.fs_AbstractMusicDirectoryCatalogueParser.__init__(self)
-        import filesearchfs
+        import audiofs.filesearchfs as filesearchfs
             # we import this here so that its dependencies are required only
             # if there's a (nonempty) search directory
         self._fs_dbBuilder = filesearchfs. \
@@ -0,0 +1,276 @@
+# Defines functions that perform batches of file I/O operations using
+# Linux's io_uring interface, so that all of the operations in a batch are
+# submitted to the kernel at once (and so can proceed concurrently) rather
+# than being performed one after another.
+#
+# Note: io_uring is accessed using the 'liburing' package, which is
+# optional: if it isn't installed then ur_isAvailable will be False and the
+# functions in this module mustn't be called.
+#
+# Copyright (C) James MacKay 2008
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+
+import functools
+import os
+
+try:
+    import liburing
+    ur_isAvailable = True
+except ImportError:
+    ur_isAvailable = False
+
+
+# Constants.
+
+# The maximum number of I/O operations that we submit to the kernel at once.
+_ur_maxBatchSize = 256
+
+
+# Functions.
+
+@functools.lru_cache(maxsize = None)
+def ur_isOperationSupported(opName):
+    """
+    Returns True iff the io_uring operation named 'opName' (for example
+    'IORING_OP_SYMLINKAT') is supported by the running kernel.
+
+    Note: this will always return False if ur_isAvailable is False.
+    """
+    assert opName
+    result = False
+    if ur_isAvailable:
+        try:
+            result = bool(liburing.probe().get(opName, False))
+        except OSError:
+            pass  # io_uring isn't usable at all
+    return result
+
+def ur_readStartOfAll(paths, numBytes):
+    """
+    Reads (up to) the first 'numBytes' bytes of each of the files whose
+    pathnames are the items in the list 'paths', discarding the data that's
+    read. The reads from all of the files are submitted at once (or in
+    batches of at most _ur_maxBatchSize files) rather than one at a time.
+
+    This is usually used to cause files to be generated and/or cached.
+
+    An OSError is raised if any of the files can't be opened or read from,
+    though not until all of the other files in the same batch have been
+    read from (or have failed to be). The files in any later batches aren't
+    read from.
+
+    Note: this function mustn't be called unless
+    ur_isOperationSupported('IORING_OP_READ') returns True.
+    """
+    assert ur_isOperationSupported('IORING_OP_READ')
+    assert paths is not None  # though it may be empty
+    assert numBytes > 0
+    for i in range(0, len(paths), _ur_maxBatchSize):
+        _ur_readStartOfAllInBatch(paths[i:i + _ur_maxBatchSize], numBytes)
+
+def _ur_readStartOfAllInBatch(paths, numBytes):
+    """
+    Reads the first 'numBytes' bytes of each of the files whose pathnames
+    are the items in the list 'paths', all of which are submitted to the
+    kernel at once.
+
+    See ur_readStartOfAll().
+    """
+    assert paths is not None
+    assert len(paths) <= _ur_maxBatchSize
+    assert numBytes > 0
+    fds = []
+    openedPaths = []  # the pathnames of the files in 'fds', in order
+    openFailure = None
+    ring = liburing.Ring()
+    liburing.io_uring_queue_init(max(len(paths), 1), ring)
+    try:
+        # The files that can't be opened are skipped, and the first failure
+        # to open one is only raised after the others have been read from.
+        for p in paths:
+            try:
+                fds.append(os.open(p, os.O_RDONLY))
+                openedPaths.append(p)
+            except OSError as ex:
+                if openFailure is None:
+                    openFailure = ex
+        bufs = [bytearray(numBytes) for fd in fds]
+        for (i, fd) in enumerate(fds):
+            sqe = liburing.io_uring_get_sqe(ring)
+            liburing.io_uring_prep_read(sqe, fd, bufs[i], numBytes, 0)
+            liburing.io_uring_sqe_set_data64(sqe, i)
+        _ur_runBatch(ring, len(fds),
+            lambda i, err: OSError(err, os.strerror(err), openedPaths[i]))
+        if openFailure is not None:
+            raise openFailure
+    finally:
+        liburing.io_uring_queue_exit(ring)
+        for fd in fds:
+            os.close(fd)
+
+def ur_sizesAndAccessTimes(paths):
+    """
+    Returns a list containing a (size, lastAccessTime) pair for each of the
+    files whose pathnames are the items in the list 'paths', in the same
+    order as 'paths': each file's size is in bytes, and its last accessed
+    time is in seconds since the epoch (as it is in an os.stat_result's
+    'st_atime'). Symlinks are followed.
+
+    The files' statuses are all obtained at once (or in batches of at most
+    _ur_maxBatchSize files) rather than one at a time.
+
+    An OSError - whose 'filename' is the file's pathname - is raised if any
+    of the files' statuses can't be obtained, though not until all of the
+    other files' statuses in the same batch have been.
+
+    Note: this function mustn't be called unless
+    ur_isOperationSupported('IORING_OP_STATX') returns True.
+    """
+    assert ur_isOperationSupported('IORING_OP_STATX')
+    assert paths is not None  # though it may be empty
+    result = []
+    for i in range(0, len(paths), _ur_maxBatchSize):
+        result.extend(_ur_sizesAndAccessTimesInBatch(
+                                            paths[i:i + _ur_maxBatchSize]))
+    assert len(result) == len(paths)
+    return result
+
+def _ur_sizesAndAccessTimesInBatch(paths):
+    """
+    Returns a list containing a (size, lastAccessTime) pair for each of the
+    files whose pathnames are the items in the list 'paths', all of whose
+    statuses are obtained by operations that are submitted to the kernel at
+    once.
+
+    See ur_sizesAndAccessTimes().
+    """
+    assert paths is not None
+    assert len(paths) <= _ur_maxBatchSize
+    if not paths:
+        return []
+    stats = [liburing.Statx() for p in paths]
+    mask = liburing.STATX_SIZE | liburing.STATX_ATIME
+    ring = liburing.Ring()
+    liburing.io_uring_queue_init(len(paths), ring)
+    try:
+        # Note: the kernel uses the pathnames' strings and fills in the
+        # Statx objects directly, so 'paths' and 'stats' must (and do) keep
+        # them alive until all of the operations have completed.
+        for (i, p) in enumerate(paths):
+            sqe = liburing.io_uring_get_sqe(ring)
+            liburing.io_uring_prep_statx(sqe, stats[i], p, 0, mask)
+            liburing.io_uring_sqe_set_data64(sqe, i)
+        _ur_runBatch(ring, len(paths),
+            lambda i, err: OSError(err, os.strerror(err), paths[i]))
+    finally:
+        liburing.io_uring_queue_exit(ring)
+    result = [(st.size, st.atime) for st in stats]
+    assert len(result) == len(paths)
+    return result
+
+def ur_symlinkAll(pairs):
+    """
+    Creates a symlink for each (src, dest) pair in the list 'pairs' with
+    pathname 'dest' that links to 'src'. The symlinks are all submitted to
+    the kernel at once (or in batches of at most _ur_maxBatchSize symlinks)
+    rather than being created one at a time, and in no particular order.
+
+    An OSError - whose 'filename' is the 'dest' and whose 'filename2' is the
+    'src' of the symlink - is raised if any of the symlinks can't be
+    created, though not until all of the other symlinks in the same batch
+    have been created (or have failed to be).
+
+    Note: this function mustn't be called unless
+    ur_isOperationSupported('IORING_OP_SYMLINKAT') returns True.
+    """
+    assert ur_isOperationSupported('IORING_OP_SYMLINKAT')
+    assert pairs is not None  # though it may be empty
+    for i in range(0, len(pairs), _ur_maxBatchSize):
+        _ur_symlinkAllInBatch(pairs[i:i + _ur_maxBatchSize])
+
+def _ur_symlinkAllInBatch(pairs):
+    """
+    Creates a symlink for each (src, dest) pair in the list 'pairs', all of
+    which are submitted to the kernel at once.
+
+    See ur_symlinkAll().
+    """
+    assert pairs is not None
+    assert len(pairs) <= _ur_maxBatchSize
+    if not pairs:
+        return
+    ring = liburing.Ring()
+    liburing.io_uring_queue_init(len(pairs), ring)
+    try:
+        # Note: the kernel uses the pathnames' strings directly, so 'pairs'
+        # must (and does) keep them alive until all of the symlinks have
+        # been created.
+        for (i, (src, dest)) in enumerate(pairs):
+            sqe = liburing.io_uring_get_sqe(ring)
+            liburing.io_uring_prep_symlink(sqe, src, dest)
+            liburing.io_uring_sqe_set_data64(sqe, i)
+        _ur_runBatch(ring, len(pairs),
+            lambda i, err: OSError(err, os.strerror(err), pairs[i][1], None,
+                                   pairs[i][0]))
+    finally:
+        liburing.io_uring_queue_exit(ring)
+
+def _ur_runBatch(ring, n, describeFailure):
+    """
+    Submits to the kernel the 'n' operations that have been queued on the
+    io_uring 'ring' - the i'th of which must have i as its user data - and
+    waits for all of them to complete.
+
+    If any of the operations fail then the OSError returned by
+    describeFailure(i, err) for the first of them to complete is raised,
+    where 'i' is the index of the failed operation and 'err' is the
+    'errno' value that describes why it failed.
+    """
+    assert ring is not None
+    assert n >= 0
+    assert describeFailure is not None
+    liburing.io_uring_submit(ring)
+
+    failure = None
+    cqe = liburing.Cqe()
+    numLeft = n
+    while numLeft > 0:
+        liburing.io_uring_wait_cqe(ring, cqe)
+        numReady = liburing.io_uring_cq_ready(ring)
+        for j in range(numReady):
+            c = cqe[j]
+            res = _ur_completionResult(c)
+            if res < 0 and failure is None:
+                failure = describeFailure(c.user_data, -res)
+        liburing.io_uring_cq_advance(ring, numReady)
+        numLeft -= numReady
+    if failure is not None:
+        raise failure
+
+def _ur_completionResult(cqe):
+    """
+    Returns the result of the completed operation described by the
+    completion queue entry 'cqe': a negative result is minus the 'errno'
+    value that describes why the operation failed.
+    """
+    assert cqe is not None
+    try:
+        result = cqe.res
+    except OSError as ex:
+        # The 'liburing' package raises an exception when a negative result
+        # is accessed.
+        result = -ex.errno
+    return result
@@ -33,6 +33,8 @@ import traceback
 import xml.sax
 import xml.sax.saxutils
 
+import audiofs.uringio as ur
+
 
 # Constants.
 
@@ -57,6 +59,10 @@ _ut_spaceUnitsInOrder = "BKMGT"
 # The multiple between consecutive units in _ut_spaceUnitsInOrder.
 _ut_spaceUnitsMultiple = 1024
 
+# The number of bytes to read from the start of a file in order to preload
+# it.
+_ut_preloadSize = 4000
+
 
 # External program pathnames.
 _ut_festivalProgram = "festival"
@@ -79,6 +85,12 @@ _ut_teeCommandFmt = _ut_teeProgram + ' "%s"'
 # this multiple times the cache's high size.
 _ut_maxLruCacheUpdateIndexMultiple = 5
 
+# A map from the pathname of each file that's been executed by
+# ut_updateMapByExecutingFile() to a (key, code) pair, where 'code' is the
+# code object compiled from the file and 'key' identifies the version of
+# the file that it was compiled from.
+_ut_compiledFiles = {}
+
 
 # Functions.
 
@@ -173,27 +185,33 @@ def ut_updateMapByExecutingFile(path, m):
     Raises a SyntaxError iff there's one or more syntax errors in the source
     file, and raises an IOError if 'path' isn't the pathname of an existing
     regular file.
+
+    Note: the code compiled from a file is cached, so a file is only read
+    and compiled again if it's changed since the last time it was executed.
     """
     #print("===> ut_updateMapByExecutingFile(%s, m) ..." % path )
     assert path is not None
     assert m is not None
-    r = None
-    content = None
-    try:
-        r = open(path, 'r')
-        content = r.read()
-    finally:
-        ut_tryToCloseAll(r)
-    if content is not None:
+    st = os.stat(path)
+    key = (st.st_ino, st.st_mtime_ns, st.st_size)
+    (cachedKey, code) = _ut_compiledFiles.get(path, (None, None))
+    if cachedKey != key:
+        r = None
+        try:
+            r = open(path, 'r')
+            content = r.read()
+        finally:
+            ut_tryToCloseAll(r)
         content += "\n"  # in case it's missing from the file
         #print("    content = [%s]" % content)
         code = compile(content, path, 'exec')
-        try:
-            exec(code, m)
-        except SyntaxError as ex:
-            raise ex
-        except Exception as ex:
-            raise SyntaxError(ex)
+        _ut_compiledFiles[path] = (key, code)
+    try:
+        exec(code, m)
+    except SyntaxError as ex:
+        raise ex
+    except Exception as ex:
+        raise SyntaxError(ex)
     #print("    done: m = %s" % ut_prettyShortMap(m))
 
 
@@ -220,7 +238,7 @@ def ut_prettyShortMap(m):
     elif not m:
         result = "{}"
     else:
-        (k, v) = m.items()[0]
+        (k, v) = next(iter(m.items()))
         result = "{ %s: %s, ... [%i] }" % (k, v, len(m))
     assert result is not None
     return result
@@ -365,13 +383,12 @@ def ut_findAttribute(obj, name):
 def ut_sortTuplesByItem(tuplesList, itemIndex):
     """
     Sorts the list of tuples 'tuplesList' in place by comparing the
-    ('itemIndex'+1)th items in the tuples (using the global 'cmp()'
-    function). (Each tuple must have at least ('itemIndex'+1) items in it.)
+    ('itemIndex'+1)th items in the tuples. (Each tuple must have at least
+    ('itemIndex'+1) items in it.)
     """
     assert tuplesList is not None
     assert itemIndex >= 0
-    f = lambda t1, t2: cmp(t1[itemIndex], t2[itemIndex])
-    tuplesList.sort(f)
+    tuplesList.sort(key = lambda t: t[itemIndex])
 
 def ut_sortFileInPlace(path, fieldSep = None):
     """
@@ -444,7 +461,7 @@ def ut_parsePortNumber(txt):
     """
     result = ut_parseInt(txt)
     if result < 0:
-        raise ValueError("Negative port number: %i" % port)
+        raise ValueError("Negative port number: %i" % result)
     assert result >= 0
     return result
 
@@ -568,7 +585,7 @@ def ut_parseSpaceIntoBytes(val):
                 mult = _ut_spaceUnitsMultiple
                 unitIndex = _ut_spaceUnitsInOrder.index(unit)
                 result = num
-                for i in xrange(unitIndex):
+                for i in range(unitIndex):
                     result *= mult
         except:
             # Either 'unit' isn't a valid unit or 'num' isn't an integer
@@ -1309,6 +1326,10 @@ def ut_preloadFiles(paths, maxWaitInSeconds = 120, doFast = False):
     #print("---> in ut_preloadFiles([%s], maxWaitInSeconds = %s, doFast = %s)" % (', '.join(paths), str(maxWaitInSeconds), str(doFast)))
     assert paths is not None  # though it may be empty
     assert maxWaitInSeconds > 0
+    if doFast and ur.ur_isOperationSupported('IORING_OP_READ'):
+        # Submit all of the reads at once rather than one after another.
+        ur.ur_readStartOfAll(paths, _ut_preloadSize)
+        return
     prev = None
     size = ut_fileSize
     waitLength = 3  # seconds
@@ -1339,7 +1360,7 @@ def ut_preloadFiles(paths, maxWaitInSeconds = 120, doFast = False):
         try:
             #print("    preloading [%s] by reading from it a little" % p)
             r = open(p, 'rb')
-            r.read(4000)
+            r.read(_ut_preloadSize)
         finally:
             if r is not None:
                 r.close()
@@ -1429,8 +1450,8 @@ class ut_MultiplexedWritableStream(object):
         self._ut_debug("---> in ut_MultiplexedWritableStream.isatty()")
         return False
 
-    def next(self):
-        self._ut_debug("---> in ut_MultiplexedWritableStream.next()")
+    def __next__(self):
+        self._ut_debug("---> in ut_MultiplexedWritableStream.__next__()")
         self._ut_handleNotReadable()
 
     def read(self, size = -1):
@@ -2120,7 +2141,7 @@ class ut_AbstractOutputDaemonProcess(ut_AbstractDaemonProcess):
             try:
                 #self._ut_debug("    about to write command output to file descriptor")
                 while True:
-                    s = rfile.read(bufSize)
+                    s = rfile.buffer.read(bufSize)
                     if s:
                         os.write(wfd, s)
                     else:
@@ -2308,7 +2329,7 @@ class ut_LeastRecentlyAddedCache(object):
         lines = []
         lines.append("Cache of class %s: low = %i, high = %i" % (self.__class__, self._ut_lowSize, self._ut_highSize))
         lines.append("From 'oldest' to 'newest' its %i items are:" % sz)
-        for i in xrange(sz):
+        for i in range(sz):
             key = lst[i]
             val = m[key]
             lines.append(itemFmt % (i, str(key), str(val)))
@@ -2346,7 +2367,7 @@ class ut_LeastRecentlyAddedCache(object):
         numToRemove = sz - self._ut_lowSize
         m = self._ut_map
         lst = self._ut_keysList
-        for i in xrange(numToRemove):
+        for i in range(numToRemove):
             key = lst[i]
             self._onRemoval(key, m[key])
             del m[key]
@@ -2475,7 +2496,7 @@ class ut_LeastRecentlyUsedCache(object):
         lines = []
         lines.append("Cache of class %s: low = %i, high = %i" % (self.__class__, self._ut_lowSize, self._ut_highSize))
         lines.append("From 'oldest' to 'newest' its %i items are:" % sz)
-        for i in xrange(sz):
+        for i in range(sz):
             key = lst[i]
             (val, updateIndex) = m[key]
             lines.append(itemFmt % (i, updateIndex, str(key), str(val)))
@@ -2568,7 +2589,7 @@ class ut_LeastRecentlyUsedCache(object):
         assert sz > self._ut_highSize
         numToRemove = sz - self._ut_lowSize
         m = self._ut_map
-        for i in xrange(self._ut_nextUpdateIndex):
+        for i in range(self._ut_nextUpdateIndex):
             key = ui2k.get(i)
             if key is not None:
                 self._onRemoval(key, m[key][0])
@@ -2586,7 +2607,7 @@ class ut_LeastRecentlyUsedCache(object):
         oldMap = self._ut_map
         newMap = {}
         newList = []
-        for i in xrange(self._ut_nextUpdateIndex):
+        for i in range(self._ut_nextUpdateIndex):
             key = ui2k.get(i)
             if key is not None:
                 val = oldMap[key][0]
@@ -2616,7 +2637,7 @@ if __name__ == '__main__':
                   (txt, str(default), res))
 
     sep = os.sep
-    print
+    print()
     for p in ["/tmp", "", "/", "/tmp/somedir/"]:
         print("components of path '%s': [%s]" %
               (p, ", ".join(ut_pathnameComponents(p, sep))))